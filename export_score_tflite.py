@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+ScorePredictor(backend="keras") が読むのと同じ .keras モデルを int8（完全整数量子化）の TFLite に書き出す。
+3出力モデル（multi / merged）は TARGET_ORDER 順の (N, 3) の1出力にまとめて書き出す。
+
+量子化の範囲合わせ（キャリブレーション）には学習画像を使い、
+書き出し後に float（Keras）版との差と1枚あたりの推論時間を表示する。
+
+例:
+    python export_score_tflite.py --num-calib 300 --threads 4
+    python export_score_tflite.py --source single   # 個別の3モデルを書き出す
+"""
+
+import argparse
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from game_test.scenes.score_predictor import (
+    MODEL_SOURCES, ScorePredictor, model_files, preprocess, resolve_model_source, tflite_model_path,
+)
+
+IMG_DIR = "single_fullbody_pose_black_bg"
+IMAGE_SIZE = 128
+
+
+def list_images(img_dir):
+    return sorted(
+        os.path.join(img_dir, f) for f in os.listdir(img_dir)
+        if f.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+
+
+def load_calibration_images(paths):
+    """ScorePredictor と同じ前処理をした (N, 128, 128, 3) float32"""
+    images = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is not None:
+            images.append(cv2.resize(img, (IMAGE_SIZE, IMAGE_SIZE)))
+    return preprocess(np.stack(images))
+
+
+def export_model(keras_path, tflite_path, calib_images):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(keras_path)
+    if len(model.outputs) > 1:
+        # TFLite では出力の順番や名前が保たれないので、1つの (N, 3) にまとめる（ScorePredictor._run_tflite が分ける）
+        outputs = tf.keras.layers.Concatenate(axis=-1, name="scores")(model.outputs)
+        model = tf.keras.Model(model.inputs, outputs, name=model.name)
+
+    def representative_dataset():
+        for img in calib_images:
+            yield [img[None].astype(np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    # 全演算を int8 にする（入出力も int8。ScorePredictor 側で量子化/逆量子化する）
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+
+    with open(tflite_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"書き出し: {tflite_path}（{os.path.getsize(tflite_path) / 1e6:.1f} MB）")
+
+
+def timed_predict(predictor, paths):
+    scores, times = [], []
+    for path in paths:
+        t0 = time.perf_counter()
+        scores.append(predictor.predict(path))
+        times.append(time.perf_counter() - t0)
+    return scores, times
+
+
+def parity_report(paths, threads, source):
+    """同じ source の float（Keras）版と int8（TFLite）版のスコア差と推論時間を表示する"""
+    ref = ScorePredictor(backend="keras", model_source=source)
+    alt = ScorePredictor(backend="tflite", num_threads=threads, model_source=source)
+
+    # 初回推論の遅さを計測に含めないよう1枚ずつ空回し
+    ref.predict(paths[0])
+    alt.predict(paths[0])
+    ref_scores, ref_times = timed_predict(ref, paths)
+    alt_scores, alt_times = timed_predict(alt, paths)
+
+    pairs = [(a, b) for a, b in zip(ref_scores, alt_scores) if a is not None and b is not None]
+    print(f"=== 比較（{source}, {len(pairs)}枚, スコアは 0〜10） ===")
+    print(f"{'target':8s} {'MAE':>8s} {'max':>8s}")
+    for name in ref.TARGET_ORDER:
+        diff = np.abs([a[name] - b[name] for a, b in pairs])
+        print(f"{name:8s} {diff.mean():8.4f} {diff.max():8.4f}")
+    print("-" * 30)
+    print(f"keras(float32): {np.mean(ref_times) * 1000:7.1f} ms/枚")
+    print(f"tflite(int8)  : {np.mean(alt_times) * 1000:7.1f} ms/枚（{threads}スレッド）")
+
+
+def main():
+    p = argparse.ArgumentParser(description="得点モデルを int8 TFLite に書き出す")
+    p.add_argument("--img-dir", default=IMG_DIR, help="キャリブレーション / 比較に使う学習画像のフォルダ")
+    p.add_argument("--num-calib", type=int, default=300, help="キャリブレーションに使う枚数")
+    p.add_argument("--num-eval", type=int, default=100, help="比較に使う枚数（キャリブレーションとは別の画像）")
+    p.add_argument("--threads", type=int, default=4, help="TFLite の推論スレッド数")
+    p.add_argument("--source", default="auto", choices=MODEL_SOURCES,
+                   help="書き出すモデル（auto は ScorePredictor と同じく一番新しいもの）")
+    p.add_argument("--no-report", action="store_true", help="書き出しだけ行う")
+    args = p.parse_args()
+
+    paths = list_images(args.img_dir)
+    random.Random(42).shuffle(paths)
+    calib_paths = paths[:args.num_calib]
+    eval_paths = paths[args.num_calib:args.num_calib + args.num_eval] or calib_paths[:args.num_eval]
+
+    print(f"キャリブレーション画像: {len(calib_paths)}枚")
+    calib_images = load_calibration_images(calib_paths)
+
+    source = resolve_model_source(args.source, "keras")
+    print(f"書き出すモデル: {source}")
+    exported = 0
+    for keras_path in model_files(source, "keras").values():
+        if not os.path.exists(keras_path):
+            print(f"警告: ファイルが見つかりません: {keras_path}")
+            continue
+        export_model(keras_path, tflite_model_path(keras_path), calib_images)
+        exported += 1
+    if not exported:
+        raise SystemExit(f"書き出せるモデルがありません（{source}）")
+
+    if not args.no_report and eval_paths:
+        # ScorePredictor が auto で選ぶものではなく、いま書き出したものどうしを比べる
+        parity_report(eval_paths, args.threads, source)
+
+
+if __name__ == "__main__":
+    main()
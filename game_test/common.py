@@ -1,10 +1,15 @@
 # common.py
 import os
+import queue
 import random
 import re
 import sys
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Dict, Optional
 
 import pygame
 
@@ -16,6 +21,15 @@ import pygame
 class GameState:
     theme: str = ""
     player_turn: int = 1
+    # 撮影直後に投げた採点の Future（ScoreScene が結果を待つ）
+    score_future: Optional[Future] = None
+    # 採点結果（プレイヤー番号 → {"Dynamic": .., "Stable": .., "Unique": ..}、0〜10）
+    shot_scores: Dict[int, dict] = field(default_factory=dict)
+
+    def start_round(self):
+        """新しいラウンド（せんこうの撮影）の前に、前のラウンド・前のゲームの採点結果を捨てる"""
+        self.score_future = None
+        self.shot_scores.clear()
 
 
 game_state = GameState()
@@ -39,6 +53,21 @@ class Config:
     PATH_IMG_BOMB = os.path.join(HARUKI_ASSET_DIR, "bakudan-white.JPG")
     PATH_SHUTTER_DIR = os.path.join(BASE_DIR, "shuttered")
 
+    # 骨格推定モデル（タイトル表示中にバックグラウンドで読み込む）
+    POSE_MODEL_PATH = "yolo11n-pose.pt"
+    POSE_MODEL_DEVICE = None  # None なら CPU
+    POSE_MODEL_BACKEND = "torch"  # "onnx" / "openvino" にすると CPU 向けランタイムで推論
+
+    # 得点モデル（"tflite" にすると export_score_tflite.py で書き出した int8 モデルで推論、
+    # "keypoints" にすると train_keypoint_scorer.py のモデルでキーポイントから直接採点）
+    SCORE_BACKEND = "keras"
+    SCORE_NUM_THREADS = 4  # tflite の推論スレッド数
+    # 読む得点モデル（"multi" / "merged" / "single"。"auto" はファイルがある中で一番新しいもの）
+    SCORE_MODEL_SOURCE = "auto"
+    # 撮影画像を骨格推定してから採点する（False なら撮影画像をそのまま採点）。
+    # 学習画像（Results.plot で描いた *_pose.png）とのスコア差を pose_score_parity.py で確かめてから True にする
+    SCORE_FROM_POSE = False
+
     # 色定義
     WHITE = (255, 255, 255)
     BLACK = (0, 0, 0)
@@ -268,7 +297,14 @@ class TextRenderer:
 
 
 class HardwareManager:
-    """カメラとMediaPipeの管理（自動検出＆エラーハンドリング）"""
+    """
+    カメラとMediaPipeの管理（自動検出＆エラーハンドリング）
+
+    カメラの読み込みは専用スレッドで行い、最新の1枚を使い回しのリングバッファに置いておく。
+    画面側は read_latest() で待たずに最新フレームを受け取る（カメラが 30 FPS でも描画は 60 FPS で回る）。
+    """
+
+    RING_SIZE = 3  # 読み出し中のフレームを、次の書き込みで上書きしないための枚数
 
     def __init__(self):
         self.cap = None
@@ -278,8 +314,20 @@ class HardwareManager:
         self.mp_drawing = None
         self.draw_spec = None
 
+        # キャプチャスレッドとリングバッファ
+        self._capture_thread = None
+        self._stop = threading.Event()    # 今のキャプチャスレッドへの停止指示（スレッドごとに作り直す）
+        self._exited = threading.Event()  # 今のキャプチャスレッドが抜けたか
+        self._release_on_exit = None      # 止まらなかったスレッドが抜ける時に閉じてもらう cap
+        self._ring_lock = threading.Lock()
+        self._ring = [None] * self.RING_SIZE
+        self._latest = -1       # 最新フレームが入っているリングの位置
+        self._seq = 0           # 何枚目のフレームか（新しいフレームかどうかの判定用）
+        self._timestamp = None  # 最新フレームを読んだ時刻（time.perf_counter）
+
     def start_camera(self):
         if self.cap is not None and self.cap.isOpened():
+            self._start_capture()
             return True
 
         try:
@@ -314,6 +362,7 @@ class HardwareManager:
                     self.cap = cap
                     self.cap.set(self.cv2.CAP_PROP_FRAME_WIDTH, Config.SCREEN_WIDTH)
                     self.cap.set(self.cv2.CAP_PROP_FRAME_HEIGHT, Config.SCREEN_HEIGHT)
+                    self._start_capture()
                     return True
                 cap.release()
 
@@ -321,10 +370,71 @@ class HardwareManager:
         return False
 
     def read_frame(self):
-        if self.cap:
-            ret, frame = self.cap.read()
-            return ret, frame
-        return False, None
+        """最新フレームを (ret, frame) で返す（待たない。まだ1枚も読めていなければ False）"""
+        _, _, frame = self.read_latest()
+        return frame is not None, frame
+
+    def read_latest(self, since_seq=None):
+        """
+        (通し番号, 時刻, フレームのコピー) を待たずに返す。まだ1枚も読めていなければ (0, None, None)。
+        通し番号が前回と同じなら、カメラからは新しいフレームが来ていない。
+        since_seq に前回の通し番号を渡すと、新しいフレームが無い時はコピーせず (通し番号, 時刻, None) を返す。
+        """
+        with self._ring_lock:
+            if self._latest < 0:
+                return 0, None, None
+            if since_seq is not None and self._seq == since_seq:
+                return self._seq, self._timestamp, None
+            return self._seq, self._timestamp, self._ring[self._latest].copy()
+
+    def _start_capture(self):
+        if self._capture_thread is not None and self._capture_thread.is_alive():
+            return
+        # 前のスレッドが止まりきっていなくても巻き込まないよう、イベントはスレッドごとに作る
+        self._stop = threading.Event()
+        self._exited = threading.Event()
+        with self._ring_lock:
+            self._latest = -1
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop, args=(self.cap, self._stop, self._exited), daemon=True
+        )
+        self._capture_thread.start()
+
+    def _capture_loop(self, cap, stop, exited):
+        """cap.read() はフレームが来るまで待つので、このスレッドだけが待つ"""
+        try:
+            failures = 0
+            while not stop.is_set():
+                with self._ring_lock:
+                    slot = (self._latest + 1) % self.RING_SIZE
+                # 確保済みのバッファに直接読み込む（大きさが合わない時だけ新しい配列が返る）
+                ret, frame = cap.read(self._ring[slot]) if self._ring[slot] is not None else cap.read()
+                if not ret or frame is None:
+                    failures += 1
+                    if failures >= 30:
+                        print("Camera read failed repeatedly; stopping capture thread.")
+                        return
+                    time.sleep(0.01)
+                    continue
+                failures = 0
+                with self._ring_lock:
+                    if stop.is_set():
+                        break
+                    self._ring[slot] = frame
+                    self._latest = slot
+                    self._seq += 1
+                    self._timestamp = time.perf_counter()
+        finally:
+            with self._ring_lock:
+                if not stop.is_set():
+                    # 読み込みをやめたので、古いフレームを最新として返し続けない
+                    self._latest = -1
+                exited.set()
+                release = self._release_on_exit is cap
+                if release:
+                    self._release_on_exit = None
+            if release:
+                cap.release()
 
     def process_pose(self, frame):
         if frame is None:
@@ -348,9 +458,316 @@ class HardwareManager:
         return frame
 
     def release(self):
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        self._stop.set()
+        thread, cap = self._capture_thread, self.cap
+        self._capture_thread = None
+        self.cap = None
+        if thread is not None:
+            thread.join(timeout=1.0)
+        with self._ring_lock:
+            self._latest = -1
+            if thread is not None and not self._exited.is_set():
+                # cap.read() から戻ってこない。読み込み中に別スレッドから閉じないよう、スレッドが抜ける時に閉じてもらう
+                print("Capture thread did not stop; the camera will be released when it exits.")
+                self._release_on_exit = cap
+                cap = None
+        if cap:
+            cap.release()
+
+
+class ModelRegistry:
+    """
+    重いモデル（YOLO）をプロセス内で1回だけ読み込んで全シーンで共有する。
+    (model_path, device, backend) ごとにバックグラウンドスレッドで読み込み＋ダミー推論（ウォームアップ）を行う。
+    ultralytics の predict はスレッドセーフではないので、共有モデルで推論する時は lock() のロックを取る。
+    """
+
+    WARMUP_SIZE = 640
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._model_locks = {}
+
+    def preload(self, model_path, device=None, backend="torch"):
+        """読み込みを開始して Future を返す（開始済みなら何もしない）"""
+        return self._future(model_path, device, backend)
+
+    def get(self, model_path, device=None, backend="torch"):
+        """モデルを返す。読み込み中なら完了まで待つ（失敗時は例外）"""
+        return self._future(model_path, device, backend).result()
+
+    def lock(self, model_path, device=None, backend="torch"):
+        """そのモデルで predict する時に取るロック（モデルごとに1つ）"""
+        key = (model_path, device, backend)
+        with self._lock:
+            return self._model_locks.setdefault(key, threading.Lock())
+
+    def is_ready(self, model_path, device=None, backend="torch"):
+        key = (model_path, device, backend)
+        with self._lock:
+            fut = self._futures.get(key)
+        return fut is not None and fut.done() and fut.exception() is None
+
+    def _future(self, model_path, device, backend):
+        key = (model_path, device, backend)
+        with self._lock:
+            fut = self._futures.get(key)
+            # 前回失敗していたら読み込み直す
+            if fut is None or (fut.done() and fut.exception() is not None):
+                fut = Future()
+                self._futures[key] = fut
+                threading.Thread(
+                    target=self._load, args=(fut, model_path, device, backend), daemon=True
+                ).start()
+            return fut
+
+    def _load(self, fut, model_path, device, backend):
+        try:
+            import numpy as np
+            from scenes.pose_estimate import load_pose_model
+
+            print(f"Loading model: {model_path} (device: {device or 'cpu'}, backend: {backend})")
+            model = load_pose_model(model_path, backend)
+            # 初回推論は重いので、黒画像で1回回しておく
+            dummy = np.zeros((self.WARMUP_SIZE, self.WARMUP_SIZE, 3), dtype=np.uint8)
+            model.predict(source=dummy, device=device, verbose=False)
+            print(f"Model ready: {model_path}")
+            fut.set_result(model)
+        except Exception as e:
+            print(f"Failed to load model '{model_path}': {e}")
+            fut.set_exception(e)
+
+
+class ScoringService:
+    """
+    得点モデル（TensorFlow）を専用スレッドで読み込み、推論もそのスレッドで行う。
+    submit(image) はすぐに Future を返すので、採点中もゲームループは止まらない。
+    まとめて投げられた画像は1回の predict_batch で推論する。
+
+    Config.SCORE_FROM_POSE なら、撮影画像を骨格推定（YOLO は models で共有）して骨格画像を
+    メモリ上で描き、それを採点する（PoseScorePipeline。ファイルには書き出さない）。
+    骨格推定モデルが読み込めなかった時は、撮影画像をそのまま採点する。
+    """
+
+    def __init__(self, models=None):
+        self.models = models
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._ready = None  # 読み込み完了で ScorePredictor が入る Future
+
+    def start(self):
+        """読み込みを開始して Future を返す（開始済みなら何もしない）"""
+        with self._lock:
+            if self._ready is None:
+                self._ready = Future()
+                threading.Thread(target=self._run, daemon=True).start()
+            return self._ready
+
+    def is_ready(self):
+        with self._lock:
+            fut = self._ready
+        return fut is not None and fut.done() and fut.exception() is None
+
+    def submit(self, image, save=True):
+        """
+        画像（パス / BGR の ndarray）の採点を依頼する。
+        Future の結果はスコアの辞書（読めない画像・骨格推定で人が見つからない画像なら None）。save=True なら scores.txt にも書き出す。
+        """
+        self.start()
+        fut = Future()
+        self._queue.put((image, save, fut))
+        return fut
+
+    def _run(self):
+        predictor = None
+        load_error = None
+        try:
+            import numpy as np
+            from scenes.keypoint_features import standing_keypoints
+            from scenes.score_predictor import ScorePredictor
+
+            predictor = ScorePredictor(backend=Config.SCORE_BACKEND, num_threads=Config.SCORE_NUM_THREADS,
+                                       model_source=Config.SCORE_MODEL_SOURCE)
+            # 初回推論（tf.function のトレース）は重いので、黒画像で1回回しておく
+            if predictor.backend == "keypoints":
+                # 全点 0 だと「見えている点がない」として飛ばされるので、立ち姿の骨格で回す
+                predictor.predict_batch([standing_keypoints()])
+            else:
+                predictor.predict_batch([np.zeros((predictor.IMAGE_HEIGHT, predictor.IMAGE_WIDTH, 3), dtype=np.uint8)])
+            score_batch = predictor.predict_batch
+            if Config.SCORE_FROM_POSE or predictor.backend == "keypoints":
+                try:
+                    score_batch = self._pose_pipeline(predictor)
+                except Exception as e:
+                    # キーポイントのモデルは骨格推定なしでは採点できない
+                    if predictor.backend == "keypoints":
+                        raise
+                    print(f"Failed to load pose model, scoring captured images directly: {e}")
+            print("Score models ready")
+            self._ready.set_result(predictor)
+        except Exception as e:
+            print(f"Failed to load score models: {e}")
+            load_error = e
+            self._ready.set_exception(e)
+
+        while True:
+            jobs = [self._queue.get()]
+            # 溜まっている依頼はまとめて1回で推論する
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if load_error is not None:
+                for _, _, fut in jobs:
+                    fut.set_exception(load_error)
+                continue
+
+            try:
+                results = score_batch([image for image, _, _ in jobs])
+            except Exception as e:
+                print(f"Scoring failed: {e}")
+                for _, _, fut in jobs:
+                    fut.set_exception(e)
+                continue
+
+            for (_, save, fut), scores in zip(jobs, results):
+                if save and scores is not None:
+                    try:
+                        predictor.save_scores(scores)
+                    except OSError as e:
+                        print(f"Failed to save scores: {e}")
+                fut.set_result(scores)
+
+    def _pose_pipeline(self, predictor):
+        """撮影画像 → 骨格推定 → 採点 を行う関数（スコアの辞書のリストを返す）を作る"""
+        from scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig
+        from scenes.pose_score import PoseScorePipeline
+
+        cfg = PoseEstimatorConfig(
+            model_path=Config.POSE_MODEL_PATH,
+            device=Config.POSE_MODEL_DEVICE,
+            backend=Config.POSE_MODEL_BACKEND,
+            kpt_radius=5,
+            line_width=2,
+            draw_on_black_bg=True,
+            draw_boxes=True,  # 学習画像と同じく人物矩形とラベルも描く
+        )
+        models = self.models or ModelRegistry()
+        key = (cfg.model_path, cfg.device, cfg.backend)
+        estimator = PoseEstimator(cfg, model=models.get(*key), model_lock=models.lock(*key))
+        pipeline = PoseScorePipeline(estimator, predictor)
+
+        def score_batch(images):
+            return [scores for scores, _ in pipeline.score_batch(images)]
+
+        return score_batch
+
+
+class FrameWriter:
+    """
+    撮影画像の JPEG 変換と保存を専用スレッドで行う（ゲームループは書き込みを待たない）。
+    submit(frame, path, callback) はすぐに Future を返し、結果は保存先のパス（失敗時は例外）。
+    callback(path, error) は書き込みスレッドから呼ばれる（成功時 error は None）。
+
+    書いたファイルは開いたまま溜めておき、FSYNC_BATCH 枚たまるか、キューが空になった時に
+    まとめて fsync してから完了を知らせる（1枚ごとの fsync で待たされないように）。
+    frame は書き終わるまで書き換えないこと（コピーを渡す）。
+    """
+
+    FSYNC_BATCH = 8
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def submit(self, frame, path, callback=None):
+        fut = Future()
+        if callback is not None:
+            fut.add_done_callback(lambda f: callback(path, f.exception()))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put((frame, path, fut))
+        return fut
+
+    def flush(self, timeout=None):
+        """ここまでに submit した分を書き終えるまで待つ（終了時用）"""
+        with self._lock:
+            if self._thread is None:
+                return None
+        fut = Future()
+        self._queue.put((None, None, fut))
+        return fut.result(timeout)
+
+    def _run(self):
+        pending = []  # (ファイル, path, Future)
+        while True:
+            try:
+                # 書きかけがある時は待たずに確認し、キューが空ならそこで fsync する
+                job = self._queue.get(block=not pending)
+            except queue.Empty:
+                self._sync(pending)
+                continue
+
+            frame, path, fut = job
+            if frame is None:  # flush
+                self._sync(pending)
+                fut.set_result(None)
+                continue
+
+            try:
+                f = self._write(frame, path)
+            except Exception as e:
+                fut.set_exception(e)
+                continue
+            if f is None:  # imwrite で保存した（fsync できない）
+                fut.set_result(path)
+                continue
+            pending.append((f, path, fut))
+            if len(pending) >= self.FSYNC_BATCH:
+                self._sync(pending)
+
+    def _write(self, frame, path):
+        """JPEG などに変換して書き込み、開いたままのファイルを返す"""
+        import cv2
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            # Use imencode to support non-ASCII paths on Windows
+            ext = os.path.splitext(path)[1] or ".jpg"
+            enc_ok, buf = cv2.imencode(ext, frame)
+        except Exception as e:
+            print(f"Failed to encode shutter frame via imencode: {e}")
+            enc_ok = False
+        if not enc_ok:
+            if not cv2.imwrite(path, frame):
+                raise OSError(f"cv2.imwrite failed: {path}")
+            return None
+
+        f = open(path, "wb")
+        try:
+            f.write(buf.tobytes())
+            f.flush()
+        except Exception:
+            f.close()
+            raise
+        return f
+
+    def _sync(self, pending):
+        for f, path, fut in pending:
+            try:
+                with f:
+                    os.fsync(f.fileno())
+            except OSError as e:
+                fut.set_exception(e)
+                continue
+            fut.set_result(path)
+        pending.clear()
 
 
 # ====================================================
@@ -366,3 +783,6 @@ class AppContext:
         self.resource_manager = ResourceManager()
         self.text_renderer = TextRenderer(self.resource_manager)
         self.hardware = HardwareManager()
+        self.models = ModelRegistry()
+        self.scoring = ScoringService(self.models)
+        self.frame_writer = FrameWriter()
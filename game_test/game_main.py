@@ -1,19 +1,73 @@
+import argparse
+import importlib
+import threading
+import time
+
+_PROCESS_START = time.perf_counter()
+
 import pygame
 from core.manager import SceneManager
-from scenes.title_scene_class import TitleScene
-from scenes.pose_scene import PoseEstimationScene
-from scenes.ex_game_scene_class import ExGameScene      ##例（本番は使わない）
-from scenes.ex_result_scene_class import ExResultScene  ##例（本番は使わない）
-##ここに自分のクラス名とファイル名を追加してください！
-from scenes.score_screen import ScoreScene
-from common import AppContext
-
-from scenes.howto_scene_class import HowToScene
-from scenes.roulette_scene_class import RouletteScene
-from scenes.camera_scene_class import CameraScene
+from common import AppContext, Config
 
-from scenes.round_result_scene_class import RoundResultScene
-from scenes.final_result_scene_class import FinalResultScene
+# シーンのモジュールは最初に使う時（か prefetch した時）に読み込む。
+# pose_scene は ultralytics / torch を読むので、起動時にまとめて import するとタイトルが出るまで待たされる。
+##ここに自分のクラス名とファイル名を追加してください！
+SCENE_CLASSES = {
+    "TitleScene": "scenes.title_scene_class",
+    "HowToScene": "scenes.howto_scene_class",
+    "RouletteScene": "scenes.roulette_scene_class",
+    "CameraScene": "scenes.camera_scene_class",
+    "PoseEstimationScene": "scenes.pose_scene",
+    "ScoreScene": "scenes.score_screen",
+    "RoundResultScene": "scenes.round_result_scene_class",
+    "FinalResultScene": "scenes.final_result_scene_class",
+    "ExGameScene": "scenes.ex_game_scene_class",      ##例（本番は使わない）
+    "ExResultScene": "scenes.ex_result_scene_class",  ##例（本番は使わない）
+}
+
+# タイトル表示中に裏で読み込んでおくシーン（ゲームの流れ順）
+PREFETCH_SCENES = ["HowToScene", "RouletteScene", "CameraScene", "ScoreScene", "RoundResultScene", "FinalResultScene"]
+
+
+class SceneRegistry:
+    """クラス名 → シーンクラス。モジュールの import は初回だけ行い、かかった時間を記録する"""
+
+    def __init__(self, modules):
+        self.modules = modules
+        self.import_times = {}  # モジュール名 → 秒
+        self._lock = threading.Lock()
+
+    def get(self, class_name):
+        module_name = self.modules[class_name]
+        with self._lock:
+            if module_name not in self.import_times:
+                t0 = time.perf_counter()
+                importlib.import_module(module_name)
+                self.import_times[module_name] = time.perf_counter() - t0
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def prefetch(self, class_names):
+        """指定したシーンのモジュールをバックグラウンドスレッドで読み込んでおく"""
+        def run():
+            for class_name in class_names:
+                try:
+                    self.get(class_name)
+                except Exception as e:
+                    print(f"Failed to prefetch scene '{class_name}': {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def print_report(self, title_time):
+        print("=== Startup report ===")
+        print(f"{'title screen':32s} {title_time * 1000:8.1f} ms")
+        for module_name, seconds in self.import_times.items():
+            print(f"{module_name:32s} {seconds * 1000:8.1f} ms")
+        print("======================")
+
+
+scene_registry = SceneRegistry(SCENE_CLASSES)
 
 
 def create_scene_factory(app):
@@ -25,18 +79,18 @@ def create_scene_factory(app):
         
         # タイトル
         if name == "title":
-            return TitleScene()
+            return scene_registry.get("TitleScene")()
 
         # 工藤が追加
         # ルール説明
         elif name == "howto":
-            return HowToScene(app)
+            return scene_registry.get("HowToScene")(app)
         # お題決め
         elif name == "roulette":
-            return RouletteScene(app)
+            return scene_registry.get("RouletteScene")(app)
         # 撮影
         elif name == "camera":
-            return CameraScene(app)
+            return scene_registry.get("CameraScene")(app)
         
         # 車戸が追加
         # ポーズ推定
@@ -51,41 +105,51 @@ def create_scene_factory(app):
                         "pose_examples/pose_example2.jpg"
                     ]
 
-            return PoseEstimationScene(app, image_paths=image_list, on_black=True, save_dir="game_test/outputs_estimated")
+            return scene_registry.get("PoseEstimationScene")(app, image_paths=image_list, on_black=True, save_dir="game_test/outputs_estimated")
         
         # モデルを使って得点を計算するファイルが必要？
 
         # 得点中間発表 
         elif name == "score":
-            return ScoreScene()
+            return scene_registry.get("ScoreScene")()
         
         # 川島が追加
         # 細かい点数発表(得点中間発表の前？)
         elif name == "round_result":
-            return RoundResultScene()
+            return scene_registry.get("RoundResultScene")()
         # 最終結果発表
         elif name == "final_result":
-            return FinalResultScene()
+            return scene_registry.get("FinalResultScene")()
 
         # 例（本番は使わない）
         elif name == "ex_game":
-            return ExGameScene()
+            return scene_registry.get("ExGameScene")()
         elif name == "ex_result":
-            return ExResultScene()
+            return scene_registry.get("ExResultScene")()
 
         else:
             raise ValueError(f"Unknown scene name: {name}")
 
     return create_scene
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pose Battle Game")
+    parser.add_argument(
+        "--startup-report", action="store_true",
+        help="タイトル表示までの時間と、シーンごとの import 時間を表示して終了する",
+    )
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     clock = pygame.time.Clock()
 
     app = AppContext(screen)
     manager = SceneManager(
-        initial_scene=TitleScene(),
+        initial_scene=scene_registry.get("TitleScene")(),
         scene_factory=create_scene_factory(app),
     )
 
@@ -95,11 +159,34 @@ def main():
 
 
     running = True
+    first_frame = True
     while running:
         dt = clock.tick(60) / 1000.0
         running = manager.run_frame(screen, dt)
         pygame.display.flip()
 
+        if first_frame:
+            first_frame = False
+            title_time = time.perf_counter() - _PROCESS_START
+            if args.startup_report:
+                # 残りのシーンも1つずつ読み込んで、それぞれの import 時間を測る
+                for class_name in SCENE_CLASSES:
+                    scene_registry.get(class_name)
+                scene_registry.print_report(title_time)
+                break
+            # タイトルが出てから、次に使うシーンとモデルを裏で読み込んでおく
+            # （タイトルまでの import と取り合わないよう、最初の表示の後に始める）
+            scene_registry.prefetch(PREFETCH_SCENES)
+            # 骨格推定モデル（torch）の読み込み＆ウォームアップ
+            app.models.preload(Config.POSE_MODEL_PATH, Config.POSE_MODEL_DEVICE, Config.POSE_MODEL_BACKEND)
+            # 得点モデル（TensorFlow）も同じくバックグラウンドで読み込む
+            app.scoring.start()
+
+    # 書き込み待ちの撮影画像を保存し終えてから終了する
+    try:
+        app.frame_writer.flush(timeout=10)
+    except Exception as e:
+        print(f"Failed to flush shutter frames: {e}")
     pygame.quit()
 
 if __name__ == "__main__":
@@ -18,6 +18,8 @@ class CameraScene(Scene):
 
         self.latest_frame = None
         self.camera_ready = False
+        self.frame_seq = 0        # 最後に表示したカメラフレームの通し番号
+        self.cam_surf = None      # そのフレームを画面サイズにしたもの（次のフレームが来るまで使い回す）
 
         self.anim_timer = 0.0
         self.wait_duration = 1.0
@@ -47,11 +49,18 @@ class CameraScene(Scene):
         )
 
     def on_enter(self):
+        # せんこう（1P）の撮影から新しいラウンドが始まる。前のゲームのスコアを ScoreScene に出さない
+        self.player_turn = game_state.player_turn
+        if self.player_turn == 1:
+            game_state.start_round()
+
         # 再入場用リセット
         self.anim_timer = 0.0
         self.is_counting = False
         self.countdown_timer = Config.COUNTDOWN_SECONDS
         self.latest_frame = None
+        self.frame_seq = 0
+        self.cam_surf = None
         self.after_shutter = False
         self.after_shutter_timer = 0.0
         self.dummy_surf.set_alpha(255)
@@ -95,20 +104,25 @@ class CameraScene(Scene):
         self.screen = surface
         self.dummy_surf.set_alpha(255)
 
-        # 1) カメラ映像
+        # 1) カメラ映像（キャプチャスレッドの最新フレームを待たずに受け取る）
         if self.camera_ready:
-            ret, frame = self.app.hardware.read_frame()
+            # 前回と同じフレームならコピーもしない（frame は None）
+            seq, _, frame = self.app.hardware.read_latest(since_seq=self.frame_seq)
         else:
-            ret, frame = False, None
+            seq, frame = 0, None
 
-        if ret and frame is not None:
+        if frame is not None and seq != self.frame_seq:
+            # 新しいフレームが来た時だけ骨格描画・変換する（同じフレームなら前回の画像を使う）
+            self.frame_seq = seq
             frame = self.app.hardware.process_pose(frame)
             cv2 = self.app.hardware.cv2
             flipped = cv2.flip(frame, 1) if cv2 else frame
-            self.latest_frame = flipped.copy()
+            self.latest_frame = flipped
             cam_surf = Utils.cvimage_to_pygame(flipped)
-            cam_surf = pygame.transform.scale(cam_surf, (Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT))
-            self.screen.blit(cam_surf, (0, 0))
+            self.cam_surf = pygame.transform.scale(cam_surf, (Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT))
+
+        if self.cam_surf is not None:
+            self.screen.blit(self.cam_surf, (0, 0))
         else:
             self.screen.blit(self.dummy_surf, (0, 0))
 
@@ -172,40 +186,25 @@ class CameraScene(Scene):
         if self.latest_frame is None:
             print("No frame available to save.")
             return
-        cv2 = self.app.hardware.cv2
-        if not cv2:
-            print("OpenCV not available, cannot save frame.")
-            return
 
-        try:
-            os.makedirs(Config.PATH_SHUTTER_DIR, exist_ok=True)
-        except OSError as e:
-            print(f"Failed to create directory '{Config.PATH_SHUTTER_DIR}': {e}")
-            return
+        # 採点はすぐに依頼しておき、結果は ScoreScene で受け取る（ここでは待たない）
+        game_state.shot_scores.pop(self.player_turn, None)
+        game_state.score_future = self.app.scoring.submit(self.latest_frame)
 
+        # 保存は app.frame_writer のスレッドで行う（JPEG 変換でシャッターの瞬間に止まらないように）
         filename = datetime.now().strftime("shutter_%Y%m%d_%H%M%S_%f.jpg")
         save_path = os.path.join(Config.PATH_SHUTTER_DIR, filename)
+        self.app.frame_writer.submit(self.latest_frame, save_path, callback=self._on_frame_saved)
+
+        self.after_shutter = True
 
-        ok = False
-        try:
-            # Use imencode to support non-ASCII paths on Windows
-            ext = os.path.splitext(save_path)[1] or ".jpg"
-            enc_ok, buf = cv2.imencode(ext, self.latest_frame)
-            if enc_ok:
-                buf.tofile(save_path)
-                ok = True
-        except Exception as e:
-            print(f"Failed to save shutter frame via imencode: {e}")
-
-        if not ok:
-            ok = cv2.imwrite(save_path, self.latest_frame)
-
-        if ok:
+    @staticmethod
+    def _on_frame_saved(save_path, error):
+        # 書き込みスレッドから呼ばれる
+        if error is None:
             print(f"Saved shutter frame: {save_path}")
         else:
-            print(f"Failed to save shutter frame: {save_path}")
-
-        self.after_shutter = True
+            print(f"Failed to save shutter frame: {save_path} ({error})")
 
     def _draw_turn(self):
         bx, by = 20, 65
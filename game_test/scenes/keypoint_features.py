@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+骨格のキーポイント（COCO 17点）を、得点モデルに入れる 51次元の特徴量にする。
+
+骨格画像を描いて VGG16 に通す代わりに、PoseEstimator.estimate が返す座標をそのまま使う。
+写真の大きさや人物の位置で値が変わらないよう、
+
+- 腰の中点（腰が見えなければ見えている点の平均）を原点にし
+- 見えている点を囲む矩形の長辺で割る
+
+信頼度が conf_threshold 未満の点は座標を 0 にし、信頼度の列で「見えていない」ことが分かるようにする。
+"""
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NUM_KPTS = 17
+FEATURE_DIM = NUM_KPTS * 3
+CONF_THRESHOLD = 0.3
+
+LEFT_HIP, RIGHT_HIP = 11, 12
+
+# 正面を向いて立っている人の (x, y)（COCO 17点の順。ウォームアップ用のそれらしい骨格）
+_STANDING_POSE = (
+    (320, 80),                           # 鼻
+    (330, 70), (310, 70),                # 目 左右
+    (340, 75), (300, 75),                # 耳 左右
+    (360, 130), (280, 130),              # 肩 左右
+    (375, 200), (265, 200),              # 肘 左右
+    (380, 265), (260, 265),              # 手首 左右
+    (345, 270), (295, 270),              # 腰 左右
+    (350, 360), (290, 360),              # 膝 左右
+    (352, 445), (288, 445),              # 足首 左右
+)
+
+
+def main_person(keypoints: np.ndarray) -> Optional[np.ndarray]:
+    """(人数, K, 3) から信頼度の合計が一番大きい人の (K, 3) を返す（誰もいなければ None）"""
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    if keypoints.ndim == 2:
+        keypoints = keypoints[None]
+    if keypoints.shape[0] == 0:
+        return None
+    return keypoints[int(np.argmax(keypoints[:, :, 2].sum(axis=1)))]
+
+
+def normalize_keypoints(kpts: np.ndarray, conf_threshold: float = CONF_THRESHOLD) -> Optional[np.ndarray]:
+    """1人分の (K, 3) [x, y, conf] → (K * 3,) float32。見えている点が2つ未満なら None"""
+    xy = kpts[:, :2].astype(np.float32)
+    conf = np.clip(kpts[:, 2].astype(np.float32), 0.0, 1.0)
+    valid = conf >= conf_threshold
+    if valid.sum() < 2:
+        return None
+
+    hips = valid[[LEFT_HIP, RIGHT_HIP]]
+    center = xy[[LEFT_HIP, RIGHT_HIP]][hips].mean(axis=0) if hips.any() else xy[valid].mean(axis=0)
+    extent = xy[valid].max(axis=0) - xy[valid].min(axis=0)
+    scale = float(extent.max()) or 1.0
+
+    norm = (xy - center) / scale
+    norm[~valid] = 0.0
+    conf[~valid] = 0.0
+    return np.concatenate([norm, conf[:, None]], axis=1).reshape(-1)
+
+
+def standing_keypoints() -> np.ndarray:
+    """全点が見えている立ち姿の (1, K, 3)（採点モデルの初回推論を空回しする時に使う）"""
+    xy = np.array(_STANDING_POSE, dtype=np.float32)
+    return np.concatenate([xy, np.ones((NUM_KPTS, 1), dtype=np.float32)], axis=1)[None]
+
+
+def as_keypoints(item: Any) -> Optional[np.ndarray]:
+    """PoseResult / (人数, K, 3) / (K, 3) の配列から (人数, K, 3) を取り出す（キーポイントでなければ None）"""
+    if hasattr(item, "keypoints_array"):
+        return item.keypoints_array()
+    if isinstance(item, np.ndarray) and item.ndim in (2, 3) and item.shape[-2:] == (NUM_KPTS, 3):
+        return item
+    return None
+
+
+def keypoint_features(
+    items: Sequence[Any], conf_threshold: float = CONF_THRESHOLD
+) -> Tuple[np.ndarray, List[int]]:
+    """
+    PoseResult やキーポイント配列のリスト → ((M, 51) float32, 特徴量を作れた項目の番号 M 個)。
+    人が写っていない / 見えている点が少ない項目は飛ばす。
+    """
+    rows: List[np.ndarray] = []
+    valid: List[int] = []
+    for i, item in enumerate(items):
+        keypoints = as_keypoints(item)
+        person = main_person(keypoints) if keypoints is not None else None
+        feature = normalize_keypoints(person, conf_threshold) if person is not None else None
+        if feature is not None:
+            rows.append(feature)
+            valid.append(i)
+    features = np.stack(rows) if rows else np.zeros((0, FEATURE_DIM), dtype=np.float32)
+    return features, valid
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+データセット全体のキーポイントを列ごとの連続配列で持つストア。
+
+ディレクトリ構成（数値はすべてリトルエンディアンの生バイナリで、np.memmap でそのまま読める）:
+
+    meta.json      … 画像数・人数・キーポイント数（ここに書かれた件数までが有効）
+    names.txt      … 画像ファイル名（1行1枚）
+    images.i32     … (画像数, 4)  [width, height, 先頭の人の行番号, 人数]
+    persons.i32    … (人数, 2)    [画像番号, person_id]
+    keypoints.f32  … (人数, K, 3) [x, y, conf]
+
+追記は各ファイルの末尾に書き足してから meta.json を置き換える。途中で止まっても
+meta.json の件数より後ろは無視され、次の追記時に切り詰められる。
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+I32 = np.dtype("<i4")
+F32 = np.dtype("<f4")
+
+
+class KeypointStore:
+    META = "meta.json"
+    NAMES = "names.txt"
+    IMAGES = "images.i32"
+    PERSONS = "persons.i32"
+    KEYPOINTS = "keypoints.f32"
+
+    def __init__(self, root: str, num_kpts: int = 17):
+        self.root = root
+        self.num_kpts = num_kpts
+        self.num_images = 0
+        self.num_persons = 0
+        self._names: Optional[List[str]] = None
+        self._name_to_index: Optional[Dict[str, int]] = None
+        self._tail_checked = False
+
+        meta_path = os.path.join(root, self.META)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.num_kpts = meta["num_kpts"]
+            self.num_images = meta["num_images"]
+            self.num_persons = meta["num_persons"]
+
+    # -------------------------
+    # 読み込み（memmap）
+    # -------------------------
+    @property
+    def names(self) -> List[str]:
+        if self._names is None:
+            names: List[str] = []
+            path = os.path.join(self.root, self.NAMES)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    for line in f:
+                        if len(names) >= self.num_images or not line.endswith(b"\n"):
+                            break
+                        names.append(line[:-1].decode("utf-8"))
+            self._names = names
+            self._name_to_index = {name: i for i, name in enumerate(names)}
+        return self._names
+
+    @property
+    def images(self) -> np.ndarray:
+        """(画像数, 4) int32 [width, height, person_start, person_count]"""
+        return self._memmap(self.IMAGES, I32, (self.num_images, 4))
+
+    @property
+    def persons(self) -> np.ndarray:
+        """(人数, 2) int32 [image_index, person_id]"""
+        return self._memmap(self.PERSONS, I32, (self.num_persons, 2))
+
+    @property
+    def keypoints(self) -> np.ndarray:
+        """(人数, K, 3) float32 [x, y, conf]（全画像ぶんが1つの連続配列）"""
+        return self._memmap(self.KEYPOINTS, F32, (self.num_persons, self.num_kpts, 3))
+
+    def __len__(self) -> int:
+        return self.num_images
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index()
+
+    def index_of(self, name: str) -> int:
+        return self._index()[name]
+
+    def _index(self) -> Dict[str, int]:
+        if self._name_to_index is None:
+            self.names
+        return self._name_to_index
+
+    def get(self, name: str) -> Tuple[np.ndarray, int, int]:
+        """ファイル名で1枚ぶんを取り出す → ((人数, K, 3) の配列, width, height)"""
+        width, height, start, count = (int(v) for v in self.images[self.index_of(name)])
+        return self.keypoints[start:start + count], width, height
+
+    def _memmap(self, filename: str, dtype, shape: Tuple[int, ...]) -> np.ndarray:
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.root, filename), dtype=dtype, mode="r", shape=shape)
+
+    # -------------------------
+    # 追記
+    # -------------------------
+    def append(self, name: str, keypoints: np.ndarray, width: int, height: int) -> bool:
+        """
+        1枚ぶんを追記する（keypoints は (人数, K, 3)）。
+        同じファイル名が既にあれば何もせず False を返す。
+        """
+        if name in self:
+            return False
+        keypoints = np.asarray(keypoints, dtype=F32).reshape(-1, self.num_kpts, 3)
+        count = keypoints.shape[0]
+
+        os.makedirs(self.root, exist_ok=True)
+        self._truncate_to_meta()
+
+        image_row = np.array([[width, height, self.num_persons, count]], dtype=I32)
+        person_rows = np.stack([
+            np.full(count, self.num_images, dtype=I32),
+            np.arange(count, dtype=I32),
+        ], axis=1)
+        self._append_bytes(self.IMAGES, image_row.tobytes())
+        self._append_bytes(self.PERSONS, person_rows.tobytes())
+        self._append_bytes(self.KEYPOINTS, keypoints.tobytes())
+        self._append_bytes(self.NAMES, (name + "\n").encode("utf-8"))
+
+        self.num_images += 1
+        self.num_persons += count
+        self._write_meta()
+        self.names.append(name)
+        self._name_to_index[name] = self.num_images - 1
+        return True
+
+    def _append_bytes(self, filename: str, data: bytes):
+        with open(os.path.join(self.root, filename), "ab") as f:
+            f.write(data)
+
+    def _write_meta(self):
+        meta = {"num_kpts": self.num_kpts, "num_images": self.num_images, "num_persons": self.num_persons}
+        path = os.path.join(self.root, self.META)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def _truncate_to_meta(self):
+        """meta.json より後ろにある書きかけのデータを切り詰める（インスタンスごとに最初の追記時だけ）"""
+        if self._tail_checked:
+            return
+        self._tail_checked = True
+        sizes = {
+            self.IMAGES: self.num_images * 4 * 4,
+            self.PERSONS: self.num_persons * 2 * 4,
+            self.KEYPOINTS: self.num_persons * self.num_kpts * 3 * 4,
+            self.NAMES: sum(len(n.encode("utf-8")) + 1 for n in self.names),
+        }
+        for filename, size in sizes.items():
+            path = os.path.join(self.root, filename)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
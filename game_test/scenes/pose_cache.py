@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+骨格推定結果のディスクキャッシュ。
+
+キーは「画像バイト列のハッシュ + モデルパス + 設定値」。同じ画像・同じ設定なら
+YOLO を回さずに、保存済みのキーポイント配列をそのまま返す。
+1エントリ = 1ファイル（非圧縮 npz, float32）で、合計サイズが上限を超えたら
+最後に使われた時刻（mtime）が古い順に消す LRU 方式。
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class PoseCache:
+    EXT = ".npz"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key → ファイルサイズ（古い順）。初回アクセス時にディレクトリから作る
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+
+    @staticmethod
+    def make_key(data: Any, *parts: Any) -> str:
+        """
+        画像データ（エンコード済みバイト列 or BGR 配列）と設定値からキーを作る。
+        配列の場合は形状も混ぜる（同じバイト列でも形が違えば別画像）。
+        """
+        h = hashlib.sha1()
+        if isinstance(data, np.ndarray):
+            h.update(repr((data.shape, str(data.dtype))).encode("utf-8"))
+            h.update(np.ascontiguousarray(data).data)
+        else:
+            h.update(data)
+        h.update(repr(parts).encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """キャッシュがあれば配列の辞書を返す（無ければ None）。"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # LRU: 使ったエントリの mtime を更新して「最近使った」扱いにする
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            if self._index is not None and key in self._index:
+                self._index.move_to_end(key)
+        return arrays
+
+    def put(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        """配列の辞書を保存し、上限を超えていれば古いものから消す。"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[WARN] pose cache write failed: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._load_index()
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._total += size
+            self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.EXT)
+
+    def _load_index(self) -> None:
+        if self._index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(self.EXT):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-len(self.EXT)], st.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total = sum(self._index.values())
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
@@ -2,10 +2,19 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import glob
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 import cv2
 import numpy as np
-from ultralytics import YOLO
+
+if TYPE_CHECKING:
+    # ultralytics（torch）は import が重いので、実際にモデルを読む関数の中で import する
+    from ultralytics import YOLO
+
+from .pose_cache import PoseCache
+from .skeleton_render import SkeletonRenderer
 
 
 class PoseEstimatorConfig:
@@ -17,6 +26,12 @@ class PoseEstimatorConfig:
         line_width: int = 2,
         draw_on_black_bg: bool = False, # ゲーム画面に重ねる前提なら False
         score_threshold: Optional[float] = None,
+        batch_size: int = 8,            # estimate_batch で1回の predict に渡す枚数
+        cache_dir: Optional[str] = None,  # 指定すると推論結果をディスクにキャッシュする
+        cache_max_mb: int = 512,
+        backend: str = "torch",         # "torch" / "onnx" / "openvino"（CPU なら onnx/openvino が速い）
+        draw_boxes: bool = True,        # 人物矩形とラベルも描くか（学習画像は描いてある。骨格だけの表示用なら False）
+        num_threads: Optional[int] = None,  # 推論スレッド数（None なら各ランタイムの既定。並列プロセスで使う時に指定）
     ):
         self.model_path = model_path
         self.device = device
@@ -24,6 +39,249 @@ class PoseEstimatorConfig:
         self.line_width = line_width
         self.draw_on_black_bg = draw_on_black_bg
         self.score_threshold = score_threshold
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir
+        self.cache_max_mb = cache_max_mb
+        self.backend = backend
+        self.draw_boxes = draw_boxes
+        self.num_threads = num_threads
+
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def exported_model_path(model_path: str, backend: str) -> str:
+    """backend 用に書き出したモデルの置き場所（.pt と同じフォルダ）"""
+    stem, _ = os.path.splitext(model_path)
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    return model_path
+
+
+def resolve_model_path(model_path: str, backend: str = "torch") -> str:
+    """
+    backend で使うモデルファイルのパスを返す。
+    onnx / openvino は初回だけ .pt から書き出し、以降は書き出し済みのファイルを使う。
+    （バッチ推論できるよう dynamic=True で書き出す）
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未対応の backend: {backend}（{', '.join(BACKENDS)} のどれか）")
+    if backend == "torch":
+        return model_path
+
+    target = exported_model_path(model_path, backend)
+    if not os.path.exists(target):
+        print(f"{model_path} を {backend} 形式に書き出しています...")
+        from ultralytics import YOLO
+
+        exported = YOLO(model_path).export(format=backend, dynamic=True)
+        if os.path.abspath(str(exported)) != os.path.abspath(target):
+            os.replace(str(exported), target)
+    return target
+
+
+def load_pose_model(model_path: str, backend: str = "torch") -> YOLO:
+    """backend に合わせて YOLO を読み込む（onnx は onnxruntime, openvino は OpenVINO で CPU 推論）"""
+    from ultralytics import YOLO
+
+    return YOLO(resolve_model_path(model_path, backend), task="pose")
+
+
+def set_inference_threads(model: YOLO, model_file: str, backend: str, threads: int,
+                          device: Optional[str] = None) -> None:
+    """
+    model の推論スレッド数を backend ごとに指定する（複数プロセスで推論する時に CPU を奪い合わないように）。
+    ultralytics は onnxruntime / OpenVINO にスレッド数を渡さないので、スレッド数を指定したセッションを
+    作り直して、このモデルの推論器だけ差し替える。model_file は resolve_model_path が返すパス。
+    """
+    if backend == "torch":
+        import torch
+
+        torch.set_num_threads(threads)
+        return
+
+    # 推論器（AutoBackend）は最初の predict で作られるので、小さな画像で1回回しておく
+    if model.predictor is None:
+        model.predict(np.zeros((32, 32, 3), dtype=np.uint8), device=device, verbose=False)
+    runtime = model.predictor.model
+
+    if backend == "onnx":
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        providers = runtime.session.get_providers()
+        runtime.session = ort.InferenceSession(model_file, sess_options=options, providers=providers)
+    elif backend == "openvino":
+        import openvino as ov
+
+        core = ov.Core()
+        ov_model = core.read_model(sorted(glob.glob(os.path.join(model_file, "*.xml")))[0])
+        if ov_model.get_parameters()[0].get_layout().empty:
+            ov_model.get_parameters()[0].set_layout(ov.Layout("NCHW"))
+        config = {
+            "INFERENCE_NUM_THREADS": threads,
+            "PERFORMANCE_HINT": getattr(runtime, "inference_mode", "LATENCY"),
+        }
+        runtime.ov_compiled_model = core.compile_model(ov_model, device_name="CPU", config=config)
+    else:
+        raise ValueError(f"未対応の backend: {backend}（{', '.join(BACKENDS)} のどれか）")
+
+
+def read_image(path: str) -> np.ndarray:
+    """画像ファイルを BGR 配列として読む（np.fromfile + imdecode なので Windows の日本語パスでも読める）。"""
+    return _decode(np.fromfile(str(path), dtype=np.uint8), path)
+
+
+def _decode(data: np.ndarray, path: Any) -> np.ndarray:
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+    if image is None:
+        raise ValueError(f"画像の読み込みに失敗: {path}")
+    return image
+
+
+class PreparedImage:
+    """
+    PoseEstimator.prepare() で読み込み済みの画像（estimate_batch にそのまま渡せる）。
+    キャッシュにあれば cached に結果が入っていて image は None（デコードしていない）。
+    """
+    __slots__ = ("source", "key", "cached", "image")
+
+    def __init__(self, source: str, key: Optional[str], cached: Optional[Dict[str, np.ndarray]],
+                 image: Optional[np.ndarray]):
+        self.source = source
+        self.key = key
+        self.cached = cached
+        self.image = image
+
+
+class PoseResult:
+    """
+    1画像ぶんの骨格推定結果（NumPy 配列ベース）。
+
+    - xy   : (N, K, 2) float32 のキーポイント座標
+    - conf : (N, K) float32 の信頼度（モデルが出さない場合は None）
+    - mask : (N, K) bool。score_threshold 未満のキーポイントは False
+    - boxes: (N, 6) float32 の人物矩形 [x1, y1, x2, y2, conf, cls]
+
+    人ごとの辞書 (keypoints) や行リスト (rows) は、参照された時に初めて作る。
+    旧来の推論辞書と同じく info["keypoints"] / info.get("base") の形でも読める。
+
+    image は推論に使った元画像（デコードは1回だけ）。元画像の上に描画する時だけ必要なので、
+    黒背景にしか描かない場合は None にして手放してよい。source がパスなら、次に参照された時に読み直す。
+    """
+    ROW_COLUMNS = ["person_id", "keypoint_id", "keypoint_name", "x", "y", "confidence", "width", "height"]
+    _DICT_KEYS = ("num_persons", "width", "height", "keypoints", "rows", "base", "source")
+
+    def __init__(
+        self,
+        xy: np.ndarray,
+        conf: Optional[np.ndarray],
+        width: int,
+        height: int,
+        kpt_names: List[str],
+        score_threshold: Optional[float] = None,
+        image: Optional[np.ndarray] = None,
+        source: Optional[str] = None,
+        boxes: Optional[np.ndarray] = None,
+    ):
+        self.xy = xy
+        self.conf = conf
+        self.width = width
+        self.height = height
+        self.kpt_names = kpt_names
+        self._image = image
+        self.boxes = boxes if boxes is not None else np.zeros((xy.shape[0], 6), dtype=np.float32)
+        self.source = source     # 入力がパスならそのパス（保存名などに使う）
+
+        if conf is not None and score_threshold is not None:
+            self.mask = conf >= score_threshold
+        else:
+            self.mask = np.ones(xy.shape[:2], dtype=bool)
+
+        self._keypoints: Optional[Dict[int, List[Dict[str, Any]]]] = None
+        self._rows: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def num_persons(self) -> int:
+        return int(self.xy.shape[0])
+
+    @property
+    def image(self) -> Optional[np.ndarray]:
+        """元画像（キャッシュヒット時など未デコードなら、ここで初めて読む）。"""
+        if self._image is None and self.source is not None:
+            self._image = read_image(self.source)
+        return self._image
+
+    @image.setter
+    def image(self, value: Optional[np.ndarray]) -> None:
+        self._image = value
+
+    @property
+    def base(self) -> Optional[np.ndarray]:
+        """旧来の info["base"] 互換（元画像）。"""
+        return self.image
+
+    def keypoints_array(self) -> np.ndarray:
+        """(N, K, 3) の [x, y, conf] 配列を返す（conf が無いモデルでは 1.0 を入れる）。"""
+        conf = self.conf if self.conf is not None else np.ones(self.xy.shape[:2], dtype=np.float32)
+        return np.concatenate([self.xy, conf[..., None]], axis=-1)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """しきい値を通ったキーポイントを列ごとの配列で返す（pandas.DataFrame にそのまま渡せる）。"""
+        pid, kid = np.nonzero(self.mask)
+        n = len(pid)
+        if self.conf is not None:
+            conf = self.conf[pid, kid]
+        else:
+            conf = np.full(n, None, dtype=object)
+        return {
+            "person_id": pid,
+            "keypoint_id": kid,
+            "keypoint_name": np.asarray(self.kpt_names, dtype=object)[kid],
+            "x": self.xy[pid, kid, 0],
+            "y": self.xy[pid, kid, 1],
+            "confidence": conf,
+            "width": np.full(n, self.width),
+            "height": np.full(n, self.height),
+        }
+
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        """キーポイント1個につき1行の辞書リスト（初回参照時に生成）。"""
+        if self._rows is None:
+            cols = self.columns()
+            values = [cols[c].tolist() for c in self.ROW_COLUMNS]
+            self._rows = [dict(zip(self.ROW_COLUMNS, row)) for row in zip(*values)]
+        return self._rows
+
+    @property
+    def keypoints(self) -> Dict[int, List[Dict[str, Any]]]:
+        """person_id → キーポイント辞書のリスト（初回参照時に生成）。"""
+        if self._keypoints is None:
+            grouped: Dict[int, List[Dict[str, Any]]] = {pid: [] for pid in range(self.num_persons)}
+            for row in self.rows:
+                grouped[row["person_id"]].append({
+                    "keypoint_id": row["keypoint_id"], "keypoint_name": row["keypoint_name"],
+                    "x": row["x"], "y": row["y"], "confidence": row["confidence"]
+                })
+            self._keypoints = grouped
+        return self._keypoints
+
+    # 旧来の推論辞書との互換
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._DICT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._DICT_KEYS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self._DICT_KEYS else default
 
 
 class PoseEstimator:
@@ -34,85 +292,193 @@ class PoseEstimator:
         "left_knee", "right_knee", "left_ankle", "right_ankle"
     ]
 
-    def __init__(self, config: Optional[PoseEstimatorConfig] = None):
+    def __init__(
+        self,
+        config: Optional[PoseEstimatorConfig] = None,
+        model: Optional[YOLO] = None,
+        model_lock: Optional[threading.Lock] = None,
+    ):
+        """
+        model を渡すとそれを使う（ModelRegistry で読み込み済みのモデルを共有する場合）。
+        ultralytics の predict はスレッドセーフではないので、共有モデルなら
+        ModelRegistry.lock() のロックを model_lock に渡し、predict をそのロックの中で呼ぶ。
+        """
         self.cfg = config or PoseEstimatorConfig()
-        self.model: YOLO = YOLO(self.cfg.model_path)
+        self.model: YOLO = model if model is not None else load_pose_model(self.cfg.model_path, self.cfg.backend)
+        self.model_lock = model_lock if model_lock is not None else threading.Lock()
+        if self.cfg.num_threads:
+            model_file = resolve_model_path(self.cfg.model_path, self.cfg.backend)
+            with self.model_lock:
+                set_inference_threads(self.model, model_file, self.cfg.backend, self.cfg.num_threads, self.cfg.device)
+        self.renderer = SkeletonRenderer(
+            kpt_radius=self.cfg.kpt_radius, line_width=self.cfg.line_width, draw_boxes=self.cfg.draw_boxes
+        )
+        self.cache: Optional[PoseCache] = None
+        if self.cfg.cache_dir:
+            self.cache = PoseCache(self.cfg.cache_dir, max_bytes=self.cfg.cache_max_mb * 1024 * 1024)
 
-    def estimate(self, image_or_path: Any) -> Dict[str, Any]:
+    def estimate(self, image_or_path: Any) -> PoseResult:
         """単一画像に対して骨格推定を行う。"""
-        results = self.model.predict(source=image_or_path, device=self.cfg.device, verbose=False)
-        res = results[0]
+        return self.estimate_batch([image_or_path], batch_size=1)[0]
 
-        # 画像サイズの取得
-        if isinstance(image_or_path, np.ndarray):
-            h, w = image_or_path.shape[:2]
-            base_img = image_or_path
-        else:
-            base_img = cv2.imread(str(image_or_path))
-            if base_img is None:
-                raise ValueError(f"画像の読み込みに失敗: {image_or_path}")
-            h, w = base_img.shape[:2]
+    def estimate_batch(self, images_or_paths: Sequence[Any], batch_size: Optional[int] = None) -> List[PoseResult]:
+        """
+        複数画像をまとめて骨格推定する。
+        batch_size 枚ずつ1回の predict に渡し、入力と同じ順番で PoseResult のリストを返す。
+        """
+        size = max(1, batch_size or self.cfg.batch_size)
+        items = list(images_or_paths)
+        infos: List[PoseResult] = []
+        for start in range(0, len(items), size):
+            infos.extend(self._estimate_chunk(items[start:start + size]))
+        return infos
 
-        # キーポイントが無い場合
-        if res.keypoints is None or res.keypoints.shape[0] == 0:
-            return {
-                "num_persons": 0, "width": w, "height": h,
-                "keypoints": {}, "rows": [], "raw": res, "base": base_img
-            }
-
-        # キーポイント抽出
-        kpts_xy = res.keypoints.xy
-        kpts_conf = res.keypoints.conf
-        num_persons, num_kpts = kpts_xy.shape[0], kpts_xy.shape[1]
-
-        # キー名
-        if len(self.COCO_KPT_NAMES_17) >= num_kpts:
-            kpt_names = self.COCO_KPT_NAMES_17[:num_kpts]
-        else:
-            kpt_names = self.COCO_KPT_NAMES_17 + [f"kpt_{i}" for i in range(len(self.COCO_KPT_NAMES_17), num_kpts)]
+    def _estimate_chunk(self, chunk: List[Any]) -> List[PoseResult]:
+        """キャッシュに無い画像だけを1回の predict にまとめて推論する。"""
+        out: List[Optional[PoseResult]] = [None] * len(chunk)
+        pending: List[Tuple[int, np.ndarray, Optional[str], Optional[str]]] = []
 
-        grouped: Dict[int, List[Dict[str, Any]]] = {}
-        all_rows: List[Dict[str, Any]] = []
+        for i, item in enumerate(chunk):
+            if isinstance(item, PreparedImage):
+                source, key, cached, image = item.source, item.key, item.cached, item.image
+                data = None
+            else:
+                if isinstance(item, np.ndarray):
+                    data, image, source = item, item, None
+                else:
+                    source = str(item)
+                    data = np.fromfile(source, dtype=np.uint8)
+                    image = None
+                key = self._cache_key(data) if self.cache is not None else None
+                cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                # パス入力のヒット時はデコードしない（元画像は PoseResult.image で必要な時に読む）
+                out[i] = self._from_cache(cached, image, source)
+                continue
 
-        for pid in range(num_persons):
-            grouped.setdefault(pid, [])
-            for kid in range(num_kpts):
-                x = float(kpts_xy[pid, kid, 0])
-                y = float(kpts_xy[pid, kid, 1])
-                conf = float(kpts_conf[pid, kid]) if kpts_conf is not None else None
+            if image is None:
+                # パスはここで1回だけデコードし、YOLO にも描画にも同じ配列を渡す
+                image = _decode(data if data is not None else np.fromfile(source, dtype=np.uint8), source)
+            pending.append((i, image, source, key))
 
-                if self.cfg.score_threshold is not None and conf is not None and conf < self.cfg.score_threshold:
-                    continue
+        if pending:
+            images = [image for _, image, _, _ in pending]
+            with self.model_lock:
+                results = self.model.predict(source=images, device=self.cfg.device, batch=len(images), verbose=False)
+            for (i, image, source, key), res in zip(pending, results):
+                info = self._to_info(image, source, res)
+                if key is not None:
+                    self.cache.put(key, self._to_cache(info))
+                out[i] = info
+        return out
 
-                grouped[pid].append({
-                    "keypoint_id": kid, "keypoint_name": kpt_names[kid],
-                    "x": x, "y": y, "confidence": conf
-                })
-                all_rows.append({
-                    "person_id": pid, "keypoint_id": kid, "keypoint_name": kpt_names[kid],
-                    "x": x, "y": y, "confidence": conf, "width": w, "height": h
-                })
+    def prepare(self, path: str) -> PreparedImage:
+        """
+        画像ファイルを読み、キャッシュを引いておく（別スレッドで先読みする用）。
+        キーはファイルのバイト列から作るので、パスを渡した時のキャッシュと共通。
+        キャッシュに無い時だけデコードする。
+        """
+        source = str(path)
+        data = np.fromfile(source, dtype=np.uint8)
+        key = self._cache_key(data) if self.cache is not None else None
+        cached = self.cache.get(key) if key is not None else None
+        image = _decode(data, source) if cached is None else None
+        return PreparedImage(source, key, cached, image)
 
-        return {
-            "num_persons": num_persons, "width": w, "height": h,
-            "keypoints": grouped, "rows": all_rows, "raw": res, "base": base_img
+    def _cache_key(self, data: np.ndarray) -> str:
+        cfg = self.cfg
+        return PoseCache.make_key(
+            data, cfg.model_path, cfg.backend, cfg.kpt_radius, cfg.line_width, cfg.score_threshold
+        )
+
+    @staticmethod
+    def _to_cache(info: PoseResult) -> Dict[str, np.ndarray]:
+        arrays = {
+            "xy": info.xy,
+            "boxes": info.boxes,
+            "size": np.array([info.width, info.height], dtype=np.int32),
         }
+        if info.conf is not None:
+            arrays["conf"] = info.conf
+        return arrays
+
+    def _from_cache(self, arrays: Dict[str, np.ndarray], image: Optional[np.ndarray], source: Optional[str]) -> PoseResult:
+        xy = arrays["xy"]
+        w, h = (int(v) for v in arrays["size"])
+        return PoseResult(
+            xy, arrays.get("conf"), w, h, self.kpt_names(xy.shape[1]),
+            score_threshold=self.cfg.score_threshold,
+            image=image, source=source, boxes=arrays["boxes"],
+        )
 
-    def draw(self, base_image: np.ndarray, raw_result, on_black: Optional[bool] = None) -> np.ndarray:
-        """推論結果を base_image 上（または黒背景）に描画して返す。"""
-        if raw_result is None:
-            return base_image
+    def _to_info(self, image: np.ndarray, source: Optional[str], res) -> PoseResult:
+        """YOLO の Results 1件を PoseResult に変換する（キーポイント単位のループは行わない）。"""
+        h, w = image.shape[:2]
 
-        h, w = base_image.shape[:2]
+        # キーポイント抽出（テンソル → NumPy を一括で）
+        if res.keypoints is None or res.keypoints.shape[0] == 0:
+            num_kpts = len(self.COCO_KPT_NAMES_17)
+            xy = np.zeros((0, num_kpts, 2), dtype=np.float32)
+            conf = None
+        else:
+            xy = res.keypoints.xy.cpu().numpy().astype(np.float32, copy=False)
+            kpts_conf = res.keypoints.conf
+            conf = kpts_conf.cpu().numpy().astype(np.float32, copy=False) if kpts_conf is not None else None
+            num_kpts = xy.shape[1]
+        boxes = res.boxes.data.cpu().numpy().astype(np.float32) if res.boxes is not None else None
+
+        return PoseResult(
+            xy, conf, w, h, self.kpt_names(num_kpts),
+            score_threshold=self.cfg.score_threshold,
+            image=image, source=source, boxes=boxes,
+        )
+
+    @classmethod
+    def kpt_names(cls, num_kpts: int) -> List[str]:
+        """モデルのキーポイント数に合わせたキー名リスト。"""
+        if len(cls.COCO_KPT_NAMES_17) >= num_kpts:
+            return cls.COCO_KPT_NAMES_17[:num_kpts]
+        return cls.COCO_KPT_NAMES_17 + [f"kpt_{i}" for i in range(len(cls.COCO_KPT_NAMES_17), num_kpts)]
+
+    def draw(
+        self,
+        result: PoseResult,
+        on_black: Optional[bool] = None,
+        size: Optional[Tuple[int, int]] = None,
+    ) -> np.ndarray:
+        """
+        推論結果を元画像上（または黒背景）に描画して、新しい配列で返す。
+        size=(width, height) を渡すとそのサイズで直接描く（描いてから縮小しない）。
+        毎回の確保も避けたい場合は self.renderer.render() を使う。
+        """
         use_black = self.cfg.draw_on_black_bg if on_black is None else on_black
-        canvas = np.zeros((h, w, 3), dtype=np.uint8) if use_black else base_image.copy()
+        w, h = size or (result.width, result.height)
+        if use_black:
+            canvas = np.zeros((h, w, 3), dtype=np.uint8)
+        else:
+            image = result.image
+            if image is None:
+                raise ValueError("元画像を保持していない結果は黒背景にしか描画できません")
+            canvas = image.copy() if image.shape[:2] == (h, w) else cv2.resize(image, (w, h), interpolation=cv2.INTER_AREA)
+        return self.renderer.draw_on(canvas, result)
 
-        drawn = raw_result.plot(img=canvas, kpt_radius=self.cfg.kpt_radius, line_width=self.cfg.line_width)
-        return drawn
+    def process_image(self, image_or_path: Any, on_black: Optional[bool] = None) -> Tuple[np.ndarray, PoseResult]:
+        """画像を渡すだけで推論→描画まで行い、(描画済画像, 推論結果) を返す。"""
+        return self._draw_and_release(self.estimate(image_or_path), on_black)
+
+    def process_batch(
+        self,
+        images_or_paths: Sequence[Any],
+        on_black: Optional[bool] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[Tuple[np.ndarray, PoseResult]]:
+        """複数画像をバッチ推論→描画し、入力順に (描画済画像, 推論結果) のリストを返す。"""
+        infos = self.estimate_batch(images_or_paths, batch_size=batch_size)
+        return [self._draw_and_release(info, on_black) for info in infos]
 
-    def process_image(self, image_or_path: Any, on_black: Optional[bool] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
-        """画像を渡すだけで推論→描画まで行い、(描画済画像, 推論辞書) を返す。"""
-        info = self.estimate(image_or_path)
-        base = info["base"]
-        drawn = self.draw(base, info["raw"], on_black=on_black)
+    def _draw_and_release(self, info: PoseResult, on_black: Optional[bool]) -> Tuple[np.ndarray, PoseResult]:
+        """描画して (描画済画像, 推論結果) を返す。黒背景に描いた時は元画像を手放す（必要なら source から読み直せる）"""
+        drawn = self.draw(info, on_black=on_black)
+        if self.cfg.draw_on_black_bg if on_black is None else on_black:
+            info.image = None
         return drawn, info
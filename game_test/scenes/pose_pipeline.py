@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+フォルダ内の画像を流れ作業で骨格推定するパイプライン。
+
+    [一覧] → [デコード(スレッドプール)] → キュー → [バッチ推論] → キュー → [書き出し(PNG/CSV/JSON)]
+
+- キューには上限があるので、何千枚あってもメモリに載るのは数バッチ分だけ
+- 書き出しが終わった画像は manifest.jsonl に1行ずつ記録する。途中で止めても、
+  次回は記録済みの画像を飛ばして続きから再開できる
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import cv2
+
+from .keypoint_store import KeypointStore
+from .pose_estimate import PoseEstimator, PoseResult
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+CSV_COLUMNS = ["image"] + PoseResult.ROW_COLUMNS
+
+_DONE = object()  # キューの終端
+
+
+def list_images(image_dir: str, exts: Tuple[str, ...] = IMAGE_EXTS) -> List[str]:
+    """フォルダ内の画像ファイル名（ソート済み）"""
+    return sorted(f for f in os.listdir(image_dir) if f.lower().endswith(exts))
+
+
+class FolderPoseExtractor:
+    """
+    image_dir の画像を推定し、save_dir に書き出す。
+
+    png_name  : 骨格画像のファイル名（{stem} / {name} が使える）。None なら PNG を書かない
+    csv_name  : 全画像まとめの CSV 名。None なら書かない
+    write_json: 画像ごとの JSON を書くか
+    manifest_name: 再開用の記録ファイル名（同じ save_dir を複数プロセスで使う時は分ける）
+    store_dir : 指定するとキーポイントを KeypointStore（memmap で読める連続配列）にも追記する
+    """
+
+    MANIFEST_NAME = "manifest.jsonl"
+
+    def __init__(
+        self,
+        estimator: PoseEstimator,
+        image_dir: str,
+        save_dir: str,
+        png_name: Optional[str] = "{stem}_pose.png",
+        csv_name: Optional[str] = "all_keypoints.csv",
+        write_json: bool = True,
+        decode_workers: int = 4,
+        queue_size: int = 32,
+        verbose: bool = True,
+        manifest_name: Optional[str] = None,
+        store_dir: Optional[str] = None,
+    ):
+        self.estimator = estimator
+        self.image_dir = image_dir
+        self.save_dir = save_dir
+        self.png_name = png_name
+        self.csv_name = csv_name
+        self.write_json = write_json
+        self.decode_workers = max(1, decode_workers)
+        self.queue_size = max(1, queue_size)
+        self.verbose = verbose
+
+        self.manifest_path = os.path.join(save_dir, manifest_name or self.MANIFEST_NAME)
+        self.csv_path = os.path.join(save_dir, csv_name) if csv_name else None
+        self.store = KeypointStore(store_dir) if store_dir else None
+
+    # -------------------------
+    # 実行
+    # -------------------------
+    def run(self, files: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        推定を実行して件数のまとめを返す。
+        files を渡すとその画像だけを対象にする（image_dir からの相対名）。
+        """
+        os.makedirs(self.save_dir, exist_ok=True)
+        done = self._resume()
+        names = list(files) if files is not None else list_images(self.image_dir)
+        todo = [name for name in names if name not in done]
+        self._log(f"対象: {len(names)}枚（処理済み {len(names) - len(todo)}枚をスキップ）")
+
+        decode_q: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        write_q: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        errors: List[BaseException] = []
+        stop = threading.Event()  # 書き出し・推論が失敗したら読み込みを止める
+        stats = {"processed": 0, "skipped": len(names) - len(todo), "no_person": 0, "failed": 0}
+
+        with ThreadPoolExecutor(max_workers=self.decode_workers) as pool:
+            reader = threading.Thread(target=self._read_stage, args=(pool, todo, decode_q, stop), daemon=True)
+            writer = threading.Thread(target=self._write_stage, args=(write_q, stats, errors, stop), daemon=True)
+            reader.start()
+            writer.start()
+            finished = False
+            try:
+                finished = self._infer_stage(decode_q, write_q, stats, errors)
+            finally:
+                # 途中で止まった場合も読み込み側が put で詰まらないように空にする
+                if not finished:
+                    stop.set()
+                    self._drain(decode_q)
+                write_q.put(_DONE)
+                writer.join()
+                reader.join()
+
+        if errors:
+            raise errors[0]
+        self._log(
+            f"完了: 推定 {stats['processed']}枚 / キーポイントなし {stats['no_person']}枚 / "
+            f"失敗 {stats['failed']}枚 / スキップ {stats['skipped']}枚"
+        )
+        return stats
+
+    # -------------------------
+    # ステージ
+    # -------------------------
+    def _read_stage(
+        self, pool: ThreadPoolExecutor, names: List[str], decode_q: "queue.Queue[Any]", stop: threading.Event
+    ):
+        """
+        読み込みをプールに投げ、(名前, Future) を順番どおりにキューへ流す（満杯なら待つ）。
+        estimator.prepare はキャッシュにある画像をデコードしないので、再実行時はファイルを読むだけで済む。
+        stop が立ったら残りは投げずに終端を流す。
+        """
+        for name in names:
+            if stop.is_set():
+                break
+            decode_q.put((name, pool.submit(self.estimator.prepare, os.path.join(self.image_dir, name))))
+        decode_q.put(_DONE)
+
+    def _infer_stage(
+        self,
+        decode_q: "queue.Queue[Any]",
+        write_q: "queue.Queue[Any]",
+        stats: Dict[str, int],
+        errors: List[BaseException],
+    ) -> bool:
+        """
+        読み込み済み画像を batch_size 枚ずつまとめて推論し、結果を書き出しキューへ。
+        終端まで読み切ったら True（書き出し側のエラーで打ち切ったら False）
+        """
+        batch_size = max(1, self.estimator.cfg.batch_size)
+        batch: List[Tuple[str, Any]] = []
+        while not errors:
+            item = decode_q.get()
+            if item is not _DONE:
+                name, fut = item
+                try:
+                    batch.append((name, fut.result()))
+                except Exception as e:
+                    stats["failed"] += 1
+                    self._log(f"読み込み失敗: {name}（{e}）")
+            if batch and (item is _DONE or len(batch) >= batch_size):
+                infos = self.estimator.estimate_batch([image for _, image in batch], batch_size=len(batch))
+                for (name, _), info in zip(batch, infos):
+                    info.source = os.path.join(self.image_dir, name)
+                    # 書き出しは黒背景に描くだけなので、元画像は手放してからキューに入れる
+                    # （キューに溜まる枚数 × 画像サイズだけメモリが増えないように。必要なら source から読み直せる）
+                    info.image = None
+                    write_q.put((name, info))
+                batch = []
+            if item is _DONE:
+                return True
+        return False
+
+    def _write_stage(
+        self, write_q: "queue.Queue[Any]", stats: Dict[str, int], errors: List[BaseException], stop: threading.Event
+    ):
+        """描画・PNG/CSV/JSON 書き出し・manifest 記録（推論とは別スレッド）"""
+        csv_file = None
+        try:
+            if self.csv_path:
+                is_new = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+                csv_file = open(self.csv_path, "a", newline="", encoding="utf-8")
+                csv_writer = csv.writer(csv_file)
+                if is_new:
+                    csv_writer.writerow(CSV_COLUMNS)
+
+            with open(self.manifest_path, "a", encoding="utf-8") as manifest:
+                while True:
+                    item = write_q.get()
+                    if item is _DONE:
+                        return
+                    name, info = item
+                    self._write_outputs(name, info)
+                    if self.store is not None:
+                        # キーポイントなしの画像も 0人 として記録する（既にあれば追記しない）
+                        self.store.append(name, info.keypoints_array(), info.width, info.height)
+                    if info.num_persons == 0:
+                        stats["no_person"] += 1
+                        self._log(f"スキップ: {name}（キーポイントなし）")
+                    elif csv_file is not None:
+                        cols = info.columns()
+                        values = [cols[c].tolist() for c in PoseResult.ROW_COLUMNS]
+                        csv_writer.writerows([name, *row] for row in zip(*values))
+                    stats["processed"] += 1
+
+                    # CSV を書き終えてから manifest に記録（再開時は csv_offset まで巻き戻す）
+                    entry = {"image": name, "num_persons": info.num_persons}
+                    if csv_file is not None:
+                        csv_file.flush()
+                        entry["csv_offset"] = csv_file.tell()
+                    manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    manifest.flush()
+        except BaseException as e:
+            errors.append(e)
+            stop.set()  # 読み込み側にもこれ以上デコードしないよう知らせる
+            # 推論側がキュー待ちで止まらないよう、終端まで読み捨てる
+            self._drain(write_q)
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+
+    def _write_outputs(self, name: str, info: PoseResult):
+        if info.num_persons == 0:
+            return
+        stem = os.path.splitext(name)[0]
+
+        if self.png_name:
+            # 書き出しスレッド専用の使い回しバッファに描く（すぐエンコードするのでコピー不要）
+            drawn = self.estimator.renderer.render(info)
+            save_img = os.path.join(self.save_dir, self.png_name.format(stem=stem, name=name))
+            ok, buf = cv2.imencode(os.path.splitext(save_img)[1] or ".png", drawn)
+            if not ok:
+                raise IOError(f"画像のエンコードに失敗: {save_img}")
+            buf.tofile(save_img)
+            self._log(f"保存: {save_img}")
+
+        if self.write_json:
+            json_path = os.path.join(self.save_dir, f"{stem}_keypoints.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "image": name,
+                    "width": info.width, "height": info.height,
+                    "num_persons": info.num_persons,
+                    "keypoints": info.keypoints
+                }, f, ensure_ascii=False, indent=2)
+            self._log(f"保存: {json_path}")
+
+    # -------------------------
+    # 再開
+    # -------------------------
+    def _resume(self) -> Set[str]:
+        """manifest から処理済みの画像名を読み、CSV を最後に記録した位置まで巻き戻す"""
+        done: Set[str] = set()
+        csv_offset: Optional[int] = None
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 書き込み途中で止まった行
+                    done.add(entry["image"])
+                    if "csv_offset" in entry:
+                        csv_offset = entry["csv_offset"]
+
+        if self.csv_path and os.path.exists(self.csv_path):
+            if not done:
+                os.remove(self.csv_path)  # manifest が無ければ最初からやり直し
+            elif csv_offset is not None and os.path.getsize(self.csv_path) > csv_offset:
+                with open(self.csv_path, "r+b") as f:
+                    f.truncate(csv_offset)
+        return done
+
+    @staticmethod
+    def _drain(q: "queue.Queue[Any]"):
+        """終端 (_DONE) が来るまでキューを読み捨てる（まだ始まっていない読み込みは取り消す）"""
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, tuple) and hasattr(item[1], "cancel"):
+                item[1].cancel()
+
+    def _log(self, msg: str):
+        if self.verbose:
+            print(msg)
@@ -10,7 +10,8 @@ import cv2
 import os
 
 from core.scene import Scene
-from scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig
+from common import Config
+from scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig, PoseResult
 
 
 class PoseEstimationScene(Scene):
@@ -61,16 +62,20 @@ class PoseEstimationScene(Scene):
         # Fonts
         self.font = self.load_font(self.CUSTOM_FONT_PATH, self.FONT_SIZE)
 
-        # 推定器の準備（必要に応じて device="cuda" やしきい値の設定）
-        cfg = PoseEstimatorConfig(
-            model_path="yolo11n-pose.pt",
-            device=None,          # "cuda" なら高速
+        # 推定器の設定（必要に応じて device="cuda" やしきい値の設定）
+        # モデル本体は app.models で共有するので、ここでは読み込まない
+        self.cfg = PoseEstimatorConfig(
+            model_path=Config.POSE_MODEL_PATH,
+            device=Config.POSE_MODEL_DEVICE,  # "cuda" なら高速
+            backend=Config.POSE_MODEL_BACKEND,
             kpt_radius=5,
             line_width=2,
             draw_on_black_bg=on_black,
+            draw_boxes=True,  # 保存する骨格画像は学習画像と同じく人物矩形とラベルも描く
             score_threshold=None,
+            cache_dir=".pose_cache",  # 同じ画像は2回目以降キャッシュから読む
         )
-        self.estimator = PoseEstimator(cfg)
+        self.estimator: Optional[PoseEstimator] = None
 
         # スレッド関連
         self._thread: Optional[threading.Thread] = None
@@ -79,7 +84,8 @@ class PoseEstimationScene(Scene):
 
         # ★ 結果表示用（複数）
         self._surfaces: List[pygame.Surface] = []
-        self._infos: List[dict] = []
+        self._infos: List[PoseResult] = []
+        self._pose_images: List[np.ndarray] = []   # 保存用（黒背景の骨格画像）
         self._index: int = 0
 
     # -------------------------
@@ -96,13 +102,22 @@ class PoseEstimationScene(Scene):
             try:
                 self._surfaces.clear()
                 self._infos.clear()
-                for path in self.image_paths:
-                    drawn_bgr, info = self.estimator.process_image(path, on_black=self.on_black)
+                self._pose_images.clear()
+                if self.estimator is None:
+                    self.estimator = self._create_estimator()
+                # ★ 全画像をまとめてバッチ推論（1枚ずつ predict しない）
+                infos = self.estimator.estimate_batch(self.image_paths)
+                renderer = self.estimator.renderer
+                for info in infos:
+                    # 黒背景の骨格画像は1回だけ描いて保存用に残す（黒背景表示ならそのまま表示にも使う）
+                    pose_bgr = renderer.render(info).copy()
+                    view_bgr = pose_bgr if self.on_black else renderer.render(info, base=info.image)
                     # Pygame Surface へ変換
-                    surf = self._bgr_to_surface(drawn_bgr)
-                    self._surfaces.append(surf)
-                    # 画像パスも持たせる（保存名に使用）
-                    info = {**info, "image_path": path}
+                    self._surfaces.append(self._bgr_to_surface(view_bgr))
+                    self._pose_images.append(pose_bgr)
+                    # 表示用 Surface を作ったら元画像は不要
+                    info.image = None
+                    # 画像パスは info.source に入っている（保存名に使用）
                     self._infos.append(info)
             except Exception as e:
                 self._error = f"error in estimating: {e}\n{traceback.format_exc()}"
@@ -113,10 +128,19 @@ class PoseEstimationScene(Scene):
         self._error = None
         self._surfaces.clear()
         self._infos.clear()
+        self._pose_images.clear()
         self._index = 0
         self._thread = threading.Thread(target=worker, daemon=True)
         self._thread.start()
 
+    def _create_estimator(self) -> PoseEstimator:
+        """共有モデルがあれば使う（ウォームアップ中なら完了まで待つ）。app が無ければ自前で読み込む。"""
+        models = getattr(self.app, "models", None)
+        if models is None:
+            return PoseEstimator(self.cfg)
+        key = (self.cfg.model_path, self.cfg.device, self.cfg.backend)
+        return PoseEstimator(self.cfg, model=models.get(*key), model_lock=models.lock(*key))
+
     def on_exit(self):
         """必要に応じて後片付け"""
         self._thread = None
@@ -199,8 +223,8 @@ class PoseEstimationScene(Scene):
 
         # 補助情報を描く
         if self.renderer and cur_info:
-            persons = cur_info.get("num_persons", 0)
-            fname = os.path.basename(cur_info.get("image_path", ""))
+            persons = cur_info.num_persons
+            fname = os.path.basename(cur_info.source or "")
             self._safe_draw_text(surface, f"file: {fname}", (20, 20))
             self._safe_draw_text(surface, f"person: {persons}", (20, 50))
             self._safe_draw_text(surface, "[←/→] switch  [S] save  [ESC] next", (20, 80))
@@ -216,25 +240,11 @@ class PoseEstimationScene(Scene):
             os.makedirs(save_dir, exist_ok=True)
 
             info = self._infos[self._index]
-            
-            raw = info.get("raw")
-            width = info.get("width")
-            height = info.get("height")
-
-            # ★ 黒背景キャンバスを作る（高さ×幅×3 の BGR）
-            black_bg = np.zeros((height, width, 3), dtype=np.uint8)
-
-            # ★ 黒背景に骨格のみを描画
-            drawn_bgr = raw.plot(
-                img=black_bg,   # ← base.copy() ではなく黒キャンバス
-                kpt_radius=self.estimator.cfg.kpt_radius,
-                line_width=self.estimator.cfg.line_width
-            )
-
-            #cv2.imwrite(save_path, drawn_bgr)
 
+            # ★ 推定時に描いておいた黒背景の骨格画像をそのまま保存（描き直さない）
+            drawn_bgr = self._pose_images[self._index]
 
-            original = os.path.basename(info.get("image_path", f"result_{self._index}.png"))
+            original = os.path.basename(info.source or f"result_{self._index}.png")
             stem, _ = os.path.splitext(original)
             save_name = f"{stem}_pose.png"
             save_path = os.path.join(save_dir, save_name)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+撮影画像 → 骨格推定 → 採点を、ファイルを介さずにメモリ上だけで行うパイプライン。
+
+従来は PoseEstimator が描いた骨格画像を PNG で保存し、ScorePredictor がそれを読み直していた。
+ここでは学習画像と同じく、元画像サイズの黒背景に人物矩形とラベル付きで描いてから cv2.resize で
+得点モデルの入力サイズ（128x128）に縮め、ファイルを介さずに predict_batch に渡す。
+（128x128 に直接描くと線の太さやぼけ方が学習画像と変わり、スコアがずれる）
+学習画像（Results.plot で描いた *_pose.png）とスコアが同じかは pose_score_parity.py で確認する。
+ScorePredictor が backend="keypoints" の時は描画もせず、キーポイントをそのまま渡す。
+"""
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .pose_estimate import PoseEstimator, PoseResult
+from .score_predictor import ScorePredictor
+from .skeleton_render import SkeletonRenderer
+
+
+class PoseScorePipeline:
+    def __init__(self, estimator: PoseEstimator, predictor: ScorePredictor):
+        self.estimator = estimator
+        self.predictor = predictor
+        # 表示用の設定（draw_boxes=False など）に関係なく、学習画像と同じ描き方をする
+        cfg = estimator.cfg
+        self.renderer = SkeletonRenderer(kpt_radius=cfg.kpt_radius, line_width=cfg.line_width, draw_boxes=True)
+
+    def score(self, image_or_path: Any) -> Tuple[Optional[dict], PoseResult]:
+        """1枚を推定→採点して (スコアの辞書, 推定結果) を返す（人が写っていなければスコアは None）"""
+        return self.score_batch([image_or_path])[0]
+
+    def score_batch(self, images_or_paths: Sequence[Any]) -> List[Tuple[Optional[dict], PoseResult]]:
+        """複数枚をまとめて推定・採点し、入力順に (スコアの辞書, 推定結果) のリストを返す"""
+        results = self.estimator.estimate_batch(images_or_paths)
+        people = [i for i, result in enumerate(results) if result.num_persons > 0]
+        scores: List[Optional[dict]] = [None] * len(results)
+        if people:
+            if self.predictor.backend == "keypoints":
+                inputs = [results[i] for i in people]
+            else:
+                inputs = list(self.render_batch([results[i] for i in people]))
+            for i, score in zip(people, self.predictor.predict_batch(inputs)):
+                scores[i] = score
+        return list(zip(scores, results))
+
+    def render_batch(self, results: Sequence[PoseResult]) -> np.ndarray:
+        """推定結果を学習画像と同じく元画像サイズの黒背景に描き、入力サイズに縮めた (N, H, W, 3) uint8"""
+        w, h = self.predictor.IMAGE_WIDTH, self.predictor.IMAGE_HEIGHT
+        batch = np.empty((len(results), h, w, 3), dtype=np.uint8)
+        for i, result in enumerate(results):
+            # ScorePredictor._load_image と同じ cv2.resize の既定（INTER_LINEAR）で、バッチの配列に直接縮める
+            cv2.resize(self.renderer.render(result), (w, h), dst=batch[i])
+        return batch
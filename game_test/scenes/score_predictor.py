@@ -1,82 +1,337 @@
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.applications.vgg16 import preprocess_input
 import cv2
 import numpy as np
 import os
+import time
+
+try:
+    from .keypoint_features import as_keypoints, keypoint_features
+except ImportError:
+    # python score_predictor.py で直接実行した時（下の単体テスト）はパッケージの外なので同じフォルダから読む
+    from keypoint_features import as_keypoints, keypoint_features
+
+# TensorFlow は import だけで数秒かかるので、モデルを読み込む時まで import しない
+
+BACKENDS = ("keras", "tflite", "keypoints")
+
+# VGG16 の preprocess_input（caffe 方式）と同じ値。学習時は cv2 の BGR 画像をそのまま渡しているので、
+# preprocess_input がチャンネルを反転した後にこの平均を引いた形になっている。
+VGG_MEAN = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+
+def preprocess(images):
+    """(N, H, W, 3) uint8 → 学習時と同じ前処理をした float32（TensorFlow なしで計算する）"""
+    return images[..., ::-1].astype(np.float32) - VGG_MEAN
+
+
+def tflite_model_path(model_path):
+    """export_score_tflite.py が書き出す int8 TFLite モデルのパス"""
+    return os.path.splitext(model_path)[0] + "_int8.tflite"
+
+
+# 個別に学習した3モデル（train_score_models.py --targets で1スコアずつ学習したもの）
+MODEL_PATHS = {
+    "Dynamic": "model/dynamic_score_model_final.keras",
+    "Stable":  "model/stable_score_model_final.keras",
+    "Unique":  "model/unique_score_model_final.keras"
+}
+# train_score_models.py で3スコアを同時に学習した3出力モデル
+MULTI_MODEL_PATH = "model/multi_score_model_final.keras"
+# merge_score_models.py で個別の3モデルを共通 VGG16 の1モデルにまとめたもの
+MERGED_MODEL_PATH = "model/merged_score_model_final.keras"
+# "auto" は上の3種類のうち一番新しく書き出されたものを使う（学習し直したモデルが無視されないように）
+MODEL_SOURCES = ("auto", "multi", "merged", "single")
+MULTI_NAME = "Multi"  # 3出力モデルの表示名
+
+
+def model_files(source, backend="keras"):
+    """source（"multi" / "merged" / "single"）で読むファイル → {表示名: パス}（tflite なら int8 版のパス）"""
+    if source == "single":
+        files = dict(MODEL_PATHS)
+    elif source == "multi":
+        files = {MULTI_NAME: MULTI_MODEL_PATH}
+    elif source == "merged":
+        files = {MULTI_NAME: MERGED_MODEL_PATH}
+    else:
+        raise ValueError(f"未対応の model_source: {source}（{', '.join(MODEL_SOURCES[1:])} のどれか）")
+    if backend == "tflite":
+        files = {name: tflite_model_path(path) for name, path in files.items()}
+    return files
+
+
+def resolve_model_source(source="auto", backend="keras"):
+    """"auto" なら、ファイルがある中で更新日時が一番新しい source を選ぶ（どれも無ければ FileNotFoundError）"""
+    if source not in MODEL_SOURCES:
+        raise ValueError(f"未対応の model_source: {source}（{', '.join(MODEL_SOURCES)} のどれか）")
+    if source != "auto":
+        return source
+
+    newest = None
+    for candidate in MODEL_SOURCES[1:]:
+        mtimes = [os.path.getmtime(path) for path in model_files(candidate, backend).values() if os.path.exists(path)]
+        if mtimes and (newest is None or max(mtimes) > newest[0]):
+            newest = (max(mtimes), candidate)
+    if newest is None:
+        paths = [path for c in MODEL_SOURCES[1:] for path in model_files(c, backend).values()]
+        raise FileNotFoundError(f"得点モデルが見つかりません: {', '.join(paths)}")
+    return newest[1]
+
+
+def _describe_file(path):
+    """ログ用に「パス（更新日時）」の文字列にする"""
+    mtime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(path)))
+    return f"{path}（更新 {mtime}）"
+
+
+def _interpreter_class():
+    """tflite_runtime があればそれを使う（TensorFlow 本体を読まずに済む）"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
 
 class ScorePredictor:
-    def __init__(self):
+    def __init__(self, backend="keras", num_threads=None, model_source="auto"):
+        """
+        backend: "keras"（float32）/ "tflite"（export_score_tflite.py で作った int8 モデル）/
+                 "keypoints"（train_keypoint_scorer.py で作ったキーポイントから採点するモデル。TensorFlow 不要）
+        num_threads: tflite の推論スレッド数（None なら TFLite の既定値）
+        model_source: 読むモデル。"multi"（train_score_models.py）/ "merged"（merge_score_models.py）/
+                      "single"（個別の3モデル）/ "auto"（ファイルがある中で一番新しいもの）
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"未対応の backend: {backend}（{', '.join(BACKENDS)} のどれか）")
+        if model_source not in MODEL_SOURCES:
+            raise ValueError(f"未対応の model_source: {model_source}（{', '.join(MODEL_SOURCES)} のどれか）")
+        self.backend = backend
+        self.num_threads = num_threads
+        self.model_source = model_source
+
         # --- 設定 ---
         self.IMAGE_HEIGHT = 128
         self.IMAGE_WIDTH = 128
         self.SCORE_FILE = "scores.txt" # 書き出すファイル名
 
-        # モデルパス定義
-        # ※実際のファイル構成に合わせてパスを修正してください
-        self.MODEL_PATHS = {
-            "Dynamic": "model/dynamic_score_model_final.keras",
-            "Stable":  "model/stable_score_model_final.keras",
-            "Unique":  "model/unique_score_model_final.keras"
-        }
+        self.TARGET_ORDER = ["Dynamic", "Stable", "Unique"]
+        # train_keypoint_scorer.py で作る、骨格画像ではなくキーポイントの座標から採点するモデル
+        self.KEYPOINT_MODEL_PATH = "model/keypoint_score_model.joblib"
 
+        self.multi_model = None
         self.loaded_models = {}
-        self.load_all_models()
+        self.interpreters = {}
+        self.keypoint_model = None
+        self._infer = None
+        if self.backend == "tflite":
+            self.load_tflite_models()
+        elif self.backend == "keypoints":
+            self.load_keypoint_model()
+        else:
+            self.load_all_models()
+            self._infer = self._build_infer_fn()
+
+    def load_tflite_models(self):
+        """int8 TFLite モデルを読み込む（起動時に1回だけ呼ぶ想定）"""
+        Interpreter = _interpreter_class()
+
+        try:
+            # keras 版と同じモデルを選ぶ（export_score_tflite.py はそのモデルを書き出している）
+            source = resolve_model_source(self.model_source, "keras")
+        except FileNotFoundError:
+            # .keras を置いていない環境では TFLite のファイルだけで選ぶ
+            source = resolve_model_source(self.model_source, "tflite")
+        keras_files = model_files(source, "keras")
+
+        print(f"=== TFLite モデル読み込み開始（{source}, スレッド数: {self.num_threads or '既定'}） ===")
+        for model_name, path in model_files(source, "tflite").items():
+            if not os.path.exists(path):
+                print(f"警告: ファイルが見つかりません: {path}（export_score_tflite.py で書き出してください）")
+                continue
+            keras_path = keras_files[model_name]
+            if os.path.exists(keras_path) and os.path.getmtime(keras_path) > os.path.getmtime(path):
+                print(f"警告: {path} は {keras_path} より古いです（export_score_tflite.py で書き出し直してください）")
+            print(f"[{model_name}] {_describe_file(path)} を読み込んでいます...")
+            try:
+                interpreter = Interpreter(model_path=path, num_threads=self.num_threads)
+                interpreter.allocate_tensors()
+            except Exception as e:
+                print(f"エラー: {model_name} の読み込みに失敗しました: {e}")
+                continue
+            self.interpreters[model_name] = interpreter
+            print(f" -> {model_name} 読み込み完了")
+
+        if not self.interpreters:
+            raise RuntimeError(f"TFLite モデルを一つも読み込めませんでした（{source}）")
+        self.model_source = source
+        print("=== 全モデル読み込み完了 ===\n")
+
+    def load_keypoint_model(self):
+        """キーポイント用のモデル（scikit-learn）を読み込む"""
+        import joblib
+
+        print("=== キーポイントモデル読み込み開始 ===")
+        if os.path.exists(self.KEYPOINT_MODEL_PATH):
+            try:
+                self.keypoint_model = joblib.load(self.KEYPOINT_MODEL_PATH)
+                print(f" -> {self.keypoint_model['kind']} 読み込み完了")
+            except Exception as e:
+                print(f"エラー: キーポイントモデルの読み込みに失敗しました: {e}")
+        else:
+            print(f"警告: ファイルが見つかりません: {self.KEYPOINT_MODEL_PATH}")
+        print("=== 全モデル読み込み完了 ===\n")
 
     def load_all_models(self):
         """モデルを全て読み込む（起動時に1回だけ呼ぶ想定）"""
-        print("=== モデル読み込み開始 ===")
-        for model_name, model_path in self.MODEL_PATHS.items():
-            if os.path.exists(model_path):
-                print(f"[{model_name}] モデルを読み込んでいます...")
-                try:
-                    self.loaded_models[model_name] = load_model(model_path)
-                    print(f" -> {model_name} 読み込み完了")
-                except Exception as e:
-                    print(f"エラー: {model_name} の読み込みに失敗しました: {e}")
-            else:
-                print(f"警告: ファイルが見つかりません: {model_path}")
+        from tensorflow.keras.models import load_model
 
-        if not self.loaded_models:
-            print("エラー: 有効なモデルが一つも読み込めませんでした。")
+        source = resolve_model_source(self.model_source, "keras")
+        print(f"=== モデル読み込み開始（{source}） ===")
+        for model_name, model_path in model_files(source, "keras").items():
+            if not os.path.exists(model_path):
+                print(f"警告: ファイルが見つかりません: {model_path}")
+                continue
+            print(f"[{model_name}] {_describe_file(model_path)} を読み込んでいます...")
+            try:
+                model = load_model(model_path)
+            except Exception as e:
+                print(f"エラー: {model_name} の読み込みに失敗しました: {e}")
+                continue
+            if model_name == MULTI_NAME:
+                # 3出力モデルは1回の呼び出しで3スコアが出る（VGG16 の共通部分を1回だけ計算する）
+                self.multi_model = model
+            else:
+                self.loaded_models[model_name] = model
+            print(f" -> {model_name} 読み込み完了")
 
+        if self.multi_model is None and not self.loaded_models:
+            raise RuntimeError(f"得点モデルを一つも読み込めませんでした（{source}）")
+        self.model_source = source
         print("=== 全モデル読み込み完了 ===\n")
 
     def predict(self, image_path):
         """
-        画像パスを受け取り、予測を実行してスコアの辞書を返す
+        画像パス（または BGR 画像の ndarray）を受け取り、予測を実行してスコアの辞書を返す
+        骨格推定から続けて採点する時は pose_score.PoseScorePipeline を使う（ファイルを介さない）
+        """
+        return self.predict_batch([image_path])[0]
+
+    def predict_batch(self, images):
+        """
+        画像パス / BGR 画像（ndarray）のリストをまとめて1回で推論し、
+        スコアの辞書のリストを同じ順で返す（読めなかった画像は None）
+        backend="keypoints" の時は、画像の代わりに PoseResult か (人数, 17, 3) のキーポイント配列を渡す
         """
-        # --- 画像の前処理 ---
-        if not os.path.exists(image_path):
-            print(f"画像が見つかりません: {image_path}")
-            return None
+        if self.backend == "keypoints":
+            return self._predict_keypoints(images)
 
-        img = cv2.imread(image_path)
-        if img is None:
-            print("画像の読み込みに失敗しました。")
-            return None
+        prepared = [self._load_image(image) for image in images]
+        valid = [i for i, img in enumerate(prepared) if img is not None]
+        results = [None] * len(prepared)
+        if not valid:
+            return results
 
-        # リサイズ & 前処理
-        img = cv2.resize(img, (self.IMAGE_WIDTH, self.IMAGE_HEIGHT))
-        img = np.array([img])
-        img = preprocess_input(img)
+        # リサイズ & 前処理（まとめて1つのテンソルにする）
+        batch = preprocess(np.stack([prepared[i] for i in valid]))
 
         # --- 予測実行 ---
-        results = {}
-        target_order = ["Dynamic", "Stable", "Unique"]
-        
-        for name in target_order:
-            model = self.loaded_models.get(name)
-            if model:
-                prediction = model.predict(img, verbose=0)
-                raw_score = prediction[0][0]
-                final_score = raw_score * 10.0
-                results[name] = final_score
-            else:
-                results[name] = 0.0
-        
+        if self.backend == "tflite":
+            raw = self._run_tflite(batch)
+        else:
+            raw = self._run_keras(batch)
+        scores = {name: pred * 10.0 for name, pred in raw.items()}
+        for row, i in enumerate(valid):
+            results[i] = {name: float(scores[name][row]) if name in scores else 0.0 for name in self.TARGET_ORDER}
         return results
 
+    def _predict_keypoints(self, items):
+        """キーポイントから採点する（骨格画像の描画も CNN も使わない）"""
+        results = [None] * len(items)
+        if any(as_keypoints(item) is None for item in items):
+            print("キーポイントではない入力があります（backend=keypoints には PoseResult かキーポイント配列を渡す）")
+        if self.keypoint_model is None:
+            return results
+
+        features, valid = keypoint_features(items, self.keypoint_model["conf_threshold"])
+        if not valid:
+            return results
+        preds = np.clip(self.keypoint_model["model"].predict(features), 0.0, 10.0).reshape(len(valid), -1)
+        names = self.keypoint_model["targets"]
+        for row, i in enumerate(valid):
+            scores = dict(zip(names, preds[row]))
+            results[i] = {name: float(scores.get(name, 0.0)) for name in self.TARGET_ORDER}
+        return results
+
+    def _load_image(self, image):
+        """パスなら読み込み、ndarray ならそのまま使い、モデルの入力サイズにそろえる"""
+        if isinstance(image, np.ndarray):
+            img = image
+        else:
+            if not os.path.exists(image):
+                print(f"画像が見つかりません: {image}")
+                return None
+            img = cv2.imread(image)
+            if img is None:
+                print("画像の読み込みに失敗しました。")
+                return None
+
+        if img.shape[:2] != (self.IMAGE_HEIGHT, self.IMAGE_WIDTH):
+            img = cv2.resize(img, (self.IMAGE_WIDTH, self.IMAGE_HEIGHT))
+        return img
+
+    def _run_keras(self, batch):
+        import tensorflow as tf
+
+        return {name: pred.numpy()[:, 0] for name, pred in self._infer(tf.constant(batch)).items()}
+
+    def _run_tflite(self, batch):
+        """int8 モデルは入出力も int8 なので、入力を量子化して出力を float に戻す"""
+        outputs = {}
+        for name, interpreter in self.interpreters.items():
+            inp = interpreter.get_input_details()[0]
+            if inp["shape"][0] != len(batch):
+                interpreter.resize_tensor_input(inp["index"], [len(batch), *batch.shape[1:]])
+                interpreter.allocate_tensors()
+                inp = interpreter.get_input_details()[0]
+            out = interpreter.get_output_details()[0]
+
+            scale, zero_point = inp["quantization"]
+            x = batch
+            if scale:
+                x = np.clip(np.round(batch / scale + zero_point), -128, 127)
+            interpreter.set_tensor(inp["index"], x.astype(inp["dtype"]))
+            interpreter.invoke()
+
+            y = interpreter.get_tensor(out["index"]).astype(np.float32)
+            scale, zero_point = out["quantization"]
+            if scale:
+                y = (y - zero_point) * scale
+            # 3出力モデルは export_score_tflite.py で TARGET_ORDER 順の (N, 3) 1出力にしてある
+            names = self.TARGET_ORDER if name == MULTI_NAME else [name]
+            for j, target in enumerate(names):
+                outputs[target] = y[:, j]
+        return outputs
+
+    def _build_infer_fn(self):
+        """
+        model.predict は呼ぶたびにデータアダプタやコールバックを準備するので、
+        1〜2枚の推論ではそちらの方が重い。モデルを直接呼ぶ tf.function を1回だけ作っておく。
+        """
+        import tensorflow as tf
+
+        spec = tf.TensorSpec([None, self.IMAGE_HEIGHT, self.IMAGE_WIDTH, 3], tf.float32)
+
+        @tf.function(input_signature=[spec])
+        def infer(batch):
+            if self.multi_model is not None:
+                # 1回の呼び出しで3つのスコアが出る
+                outputs = self.multi_model(batch, training=False)
+                return dict(zip(self.TARGET_ORDER, outputs))
+            return {name: model(batch, training=False) for name, model in self.loaded_models.items()}
+
+        return infer
+
     def save_scores(self, scores_dict):
         """
         スコア辞書を受け取り、テキストファイルに保存する
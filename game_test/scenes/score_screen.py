@@ -5,6 +5,7 @@ import os
 # もしSceneクラスが common.py にあるなら from common import Scene など
 # ここでは便宜上、上記のSceneクラスを継承する前提で書きます
 from core.scene import Scene  # ※Sceneクラスが定義されているファイル名に合わせて変更してください
+from common import game_state
 
 class ScoreScene(Scene):
     def __init__(self):
@@ -21,6 +22,7 @@ class ScoreScene(Scene):
         # --- 設定 ---
         self.WIDTH, self.HEIGHT = 800, 600
         self.SEGMENT_LIMITS = [100.0, 100.0, 300.0]
+        self.SCORE_NAMES = ["Dynamic", "Stable", "Unique"]  # 各区間に対応する採点結果（0〜10）
         self.ANIM_SPEED = 180.0
         
         # これで game_test/finalscores.txt を指すようになります
@@ -125,8 +127,9 @@ class ScoreScene(Scene):
         self.countdown_timer = 0
         self.all_done = False
         
-        # 初回のスコア読み込み
+        # 初回のスコア読み込み（撮影時の採点結果があればそちらを優先）
         self.try_read_scores_file()
+        self.apply_shot_scores()
 
     def clamp_val(self, v, limit):
         return max(0.0, min(limit, v))
@@ -149,8 +152,40 @@ class ScoreScene(Scene):
                     b.append(self.clamp_val(float(parts[i+3]), self.SEGMENT_LIMITS[i]))
                 self.target_red_segs = r
                 self.target_blue_segs = b
+                # 撮影時の採点結果があれば、ファイルの値よりそちらを表示する
+                self.apply_shot_scores()
         except: pass
 
+    def apply_shot_scores(self):
+        """game_state.shot_scores（0〜10）を各区間の上限に合わせてメーターの目標値にする"""
+        for player, scores in game_state.shot_scores.items():
+            segs = [self.clamp_val(scores.get(name, 0.0) / 10.0 * limit, limit)
+                    for name, limit in zip(self.SCORE_NAMES, self.SEGMENT_LIMITS)]
+            if player == 1:
+                self.target_red_segs = segs
+            else:
+                self.target_blue_segs = segs
+
+    def score_ready(self):
+        """採点の Future が終わっていれば True（待つものが無い時も True）"""
+        fut = game_state.score_future
+        if fut is None:
+            return True
+        if not fut.done():
+            return False
+
+        game_state.score_future = None
+        try:
+            scores = fut.result()
+        except Exception as e:
+            print(f"採点に失敗しました: {e}")
+            return True
+        print(f"採点結果: {scores}")
+        if scores is not None:
+            game_state.shot_scores[game_state.player_turn] = scores
+            self.apply_shot_scores()
+        return True
+
     def step_list(self, curr, targ, dt):
         out = []
         maxstep = self.ANIM_SPEED * dt
@@ -197,7 +232,8 @@ class ScoreScene(Scene):
             else:
                 all_chars_finished = False
         
-        if all_chars_finished:
+        # 撮影時に投げた採点が終わるまでは、タイトルが落ちきってもメーターに進まない
+        if all_chars_finished and self.score_ready():
             self.title_animation_done = True
 
         # 2. メーター伸びるアニメーション
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+キーポイント配列から骨格を直接描く軽量レンダラ。
+
+ultralytics の Results.plot は描画のたびに Annotator を作り、キャンバスを複製し、
+人物矩形やラベルまで描く。ここでは骨格（線＋点）だけを、色ごとにまとめた
+cv2.polylines と cv2.circle で描く。配色・骨格の結び方は ultralytics の COCO 17点と同じ。
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# ultralytics.utils.plotting.Colors.pose_palette と同じ値（そのまま BGR として使う）
+POSE_PALETTE = np.array([
+    [255, 128, 0], [255, 153, 51], [255, 178, 102], [230, 230, 0], [255, 153, 255],
+    [153, 204, 255], [255, 102, 255], [255, 51, 255], [102, 178, 255], [51, 153, 255],
+    [255, 153, 153], [255, 102, 102], [255, 51, 51], [153, 255, 153], [102, 255, 102],
+    [51, 255, 51], [0, 255, 0], [0, 0, 255], [255, 0, 0], [255, 255, 255],
+], dtype=np.uint8)
+
+# COCO 17点の骨格（0始まりのキーポイント番号の組）
+SKELETON = np.array([
+    [15, 13], [13, 11], [16, 14], [14, 12], [11, 12], [5, 11], [6, 12], [5, 6], [5, 7], [6, 8],
+    [7, 9], [8, 10], [1, 2], [0, 1], [0, 2], [1, 3], [2, 4], [3, 5], [4, 6],
+])
+LIMB_COLOR = POSE_PALETTE[[9, 9, 9, 9, 7, 7, 7, 0, 0, 0, 0, 0, 16, 16, 16, 16, 16, 16, 16]]
+KPT_COLOR = POSE_PALETTE[[16, 16, 16, 16, 16, 0, 0, 0, 0, 0, 0, 9, 9, 9, 9, 9, 9]]
+
+BOX_COLOR = (255, 42, 4)  # ultralytics の person クラスの枠色（BGR）
+
+
+class SkeletonRenderer:
+    """
+    kpt_radius / line_width は元画像サイズでの太さ。別サイズで描く時は縮尺に合わせて細く（太く）する。
+    conf_thres 未満の点と、それにつながる線は描かない（Results.plot が Annotator.kpts に渡す 0.25 と同じ）。
+    Results.plot と画素単位で同じになるかは skeleton_render_parity.py で確認する。
+    draw_boxes=True なら Results.plot の既定と同じく人物矩形と "person 0.xx" も描く
+    （得点モデルの学習画像はこの形。画面に骨格だけを出したい時は False を指定する）。
+    """
+
+    def __init__(
+        self,
+        kpt_radius: int = 5,
+        line_width: int = 2,
+        conf_thres: float = 0.25,
+        draw_boxes: bool = True,
+    ):
+        self.kpt_radius = kpt_radius
+        self.line_width = line_width
+        self.conf_thres = conf_thres
+        self.draw_boxes = draw_boxes
+        self._buffers: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def render(self, result, size: Optional[Tuple[int, int]] = None, base: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        size=(width, height) のキャンバスに描いて返す（省略時は元画像サイズ）。
+        base を渡すとそれを縮小/拡大した上に、無ければ黒背景に描く。
+
+        戻り値は使い回しのバッファなので、次の render で上書きされる。
+        残しておく場合は呼び出し側で copy() すること。
+        """
+        w, h = size or (result.width, result.height)
+        buf = self._buffers.get((w, h))
+        if buf is None:
+            buf = np.empty((h, w, 3), dtype=np.uint8)
+            self._buffers[(w, h)] = buf
+
+        if base is None:
+            buf.fill(0)
+        elif base.shape[:2] == (h, w):
+            np.copyto(buf, base)
+        else:
+            cv2.resize(base, (w, h), dst=buf, interpolation=cv2.INTER_AREA)
+        return self.draw_on(buf, result)
+
+    def draw_on(self, canvas: np.ndarray, result) -> np.ndarray:
+        """canvas（元画像と同じ縦横比のどんなサイズでもよい）に直接描き込んで返す"""
+        if result.num_persons == 0:
+            return canvas
+
+        h, w = canvas.shape[:2]
+        sx, sy = w / result.width, h / result.height
+        scale = min(sx, sy)
+        radius = max(1, int(round(self.kpt_radius * scale)))
+        # ultralytics と同じく線の太さは line_width の半分（切り上げ）
+        thickness = max(1, int(np.ceil(self.line_width * scale / 2)))
+
+        xy = result.xy
+        visible = result.mask & (xy[..., 0] > 0) & (xy[..., 1] > 0)
+        if result.conf is not None:
+            visible &= result.conf >= self.conf_thres
+        pts = (xy * np.array([sx, sy], dtype=np.float32)).astype(np.int32)
+
+        if self.draw_boxes:
+            self._draw_boxes(canvas, result, sx, sy, scale)
+
+        # 点（先に描いて、線を上に重ねるのは ultralytics と同じ順番）
+        # cv2 には円をまとめて描く関数がなく、ultralytics も1点ずつ cv2.circle で描いている。
+        # 重なった点のアンチエイリアスの混ざり方まで同じにするため、ここも同じ順番で1点ずつ描く
+        num_kpts = xy.shape[1]
+        kpt_color = KPT_COLOR if num_kpts == len(KPT_COLOR) else np.tile(POSE_PALETTE[16], (num_kpts, 1))
+        for pid, kid in zip(*np.nonzero(visible)):
+            cv2.circle(canvas, (int(pts[pid, kid, 0]), int(pts[pid, kid, 1])), radius,
+                       kpt_color[kid].tolist(), -1, lineType=cv2.LINE_AA)
+
+        # 線: 同じ色の線分を全員ぶんまとめて1回の polylines で描く
+        if num_kpts != len(KPT_COLOR):
+            return canvas
+        a, b = SKELETON[:, 0], SKELETON[:, 1]
+        limb_visible = visible[:, a] & visible[:, b]                      # (N, 19)
+        segments = np.stack([pts[:, a], pts[:, b]], axis=2)               # (N, 19, 2, 2)
+        for color in np.unique(LIMB_COLOR, axis=0):
+            limbs = np.all(LIMB_COLOR == color, axis=1)
+            segs = segments[:, limbs][limb_visible[:, limbs]]
+            if len(segs):
+                cv2.polylines(canvas, list(segs), False, color.tolist(), thickness, lineType=cv2.LINE_AA)
+        return canvas
+
+    def _draw_boxes(self, canvas: np.ndarray, result, sx: float, sy: float, scale: float):
+        lw = max(1, int(round(self.line_width * scale)))
+        for x1, y1, x2, y2, conf, _ in result.boxes:
+            p1 = (int(x1 * sx), int(y1 * sy))
+            p2 = (int(x2 * sx), int(y2 * sy))
+            cv2.rectangle(canvas, p1, p2, BOX_COLOR, lw, lineType=cv2.LINE_AA)
+            label = f"person {conf:.2f}"
+            font_scale = lw / 3
+            (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, max(lw - 1, 1))
+            top = p1[1] - th - 3 if p1[1] - th - 3 >= 0 else p1[1] + th + 3
+            cv2.rectangle(canvas, p1, (p1[0] + tw, top), BOX_COLOR, -1, lineType=cv2.LINE_AA)
+            text_y = p1[1] - 2 if top < p1[1] else p1[1] + th + 2
+            cv2.putText(canvas, label, (p1[0], text_y), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                        (255, 255, 255), max(lw - 1, 1), lineType=cv2.LINE_AA)
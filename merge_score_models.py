@@ -0,0 +1,112 @@
+import argparse
+import os
+
+import cv2
+import numpy as np
+from tensorflow.keras import Input, Model
+from tensorflow.keras.applications.vgg16 import preprocess_input
+from tensorflow.keras.models import load_model
+
+# ==========================================
+# Dynamic / Stable / Unique の3モデルを1つのグラフにまとめる
+# ==========================================
+# 3モデルとも VGG16 の後ろ4層以外（block4_pool まで）は ImageNet の重みで固定したまま学習している。
+# その共通部分（trunk）を1回だけ計算し、学習済みの後ろ4層＋ヘッドを3本に枝分かれさせる。
+#
+#   input → [VGG16 block1〜block4 (共通)] ─┬→ [block5 + head] → Dynamic
+#                                           ├→ [block5 + head] → Stable
+#                                           └→ [block5 + head] → Unique
+
+image_height = 128
+image_width = 128
+
+MODEL_PATHS = {
+    "Dynamic": "model/dynamic_score_model_final.keras",
+    "Stable":  "model/stable_score_model_final.keras",
+    "Unique":  "model/unique_score_model_final.keras"
+}
+# train_score_models.py の3出力モデル（multi_score_model_final.keras）とは別のファイルにする
+OUTPUT_PATH = "model/merged_score_model_final.keras"
+TARGET_ORDER = ["Dynamic", "Stable", "Unique"]
+NUM_TRAINABLE_VGG_LAYERS = 4  # model_*.py の base_model.layers[:-4] に合わせる
+
+
+def clone_layer(layer, prefix):
+    """同じ設定の層を別名で作る（重みは呼び出して build した後に set_weights で写す）"""
+    config = layer.get_config()
+    config["name"] = f"{prefix}_{layer.name}"
+    return layer.__class__.from_config(config)
+
+
+def check_frozen_weights(vgg_models, num_frozen):
+    """固定していた層の重みが3モデルで同じか確認する（違えば共通化できない）"""
+    ref = vgg_models[0]
+    for other in vgg_models[1:]:
+        for ref_layer, layer in zip(ref.layers[:num_frozen], other.layers[:num_frozen]):
+            for w_ref, w in zip(ref_layer.get_weights(), layer.get_weights()):
+                if not np.allclose(w_ref, w):
+                    return ref_layer.name
+    return None
+
+
+def build_multi_model(models):
+    vgg_models = [models[name].layers[0] for name in TARGET_ORDER]
+    num_frozen = len(vgg_models[0].layers) - NUM_TRAINABLE_VGG_LAYERS
+
+    mismatch = check_frozen_weights(vgg_models, num_frozen)
+    if mismatch is not None:
+        raise ValueError(f"固定層 '{mismatch}' の重みがモデル間で異なるため共通化できません。")
+
+    ref_vgg = vgg_models[0]
+    trunk_output = ref_vgg.layers[num_frozen - 1].output
+    trunk = Model(ref_vgg.input, trunk_output, name="shared_trunk")
+    trunk.trainable = False
+
+    inputs = Input(shape=(image_height, image_width, 3), name="image")
+    features = trunk(inputs)
+
+    outputs = []
+    for name, vgg in zip(TARGET_ORDER, vgg_models):
+        prefix = name.lower()
+        x = features
+        # 学習済みの後ろ4層（block5）＋ヘッド（GAP → Dense → BN → Dropout → Dense）
+        for layer in vgg.layers[num_frozen:] + models[name].layers[1:]:
+            clone = clone_layer(layer, prefix)
+            x = clone(x)
+            clone.set_weights(layer.get_weights())
+        outputs.append(x)
+
+    return Model(inputs, outputs, name="multi_score_model")
+
+
+def compare_outputs(models, merged, image_path):
+    """元の3モデルと結合モデルの出力を比べる"""
+    img = cv2.imread(image_path) if os.path.exists(image_path) else None
+    if img is None:
+        print("比較用画像なし（ランダム入力で比較します）")
+        img = np.random.default_rng(0).integers(0, 256, (image_height, image_width, 3)).astype(np.uint8)
+    img = cv2.resize(img, (image_width, image_height))
+    img = preprocess_input(np.array([img], dtype=np.float32))
+
+    merged_preds = merged(img, training=False)
+    for name, pred in zip(TARGET_ORDER, merged_preds):
+        single = float(models[name](img, training=False)[0][0])
+        multi = float(pred[0][0])
+        print(f"{name:8s}: 個別 {single * 10.0:6.3f} / 結合 {multi * 10.0:6.3f} (差 {abs(single - multi) * 10.0:.2e})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="3つのスコアモデルを共通 VGG16 の1モデルにまとめる")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--check-image", default="test/2011tokyo_mister_fp-011-320x480.jpg")
+    args = parser.parse_args()
+
+    print("=== モデル読み込み ===")
+    models = {name: load_model(path) for name, path in MODEL_PATHS.items()}
+
+    merged = build_multi_model(models)
+    merged.summary()
+    compare_outputs(models, merged, args.check_image)
+
+    merged.save(args.output)
+    print(f"結合モデルを保存しました: {args.output}")
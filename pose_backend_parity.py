@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+PyTorch 版と ONNX Runtime / OpenVINO 版の骨格推定結果が一致するかを確認する。
+
+pose_examples/ の各画像で
+- 検出人数が同じか
+- 対応する人物どうしのキーポイント座標の差（ピクセル）と信頼度の差
+- 1枚あたりの推論時間
+を表示し、座標の差が --tol を超えたら終了コード 1 を返す。
+
+例:
+    python pose_backend_parity.py --backend onnx
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from game_test.scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig
+from game_test.scenes.pose_pipeline import list_images
+
+VISIBLE_CONF = 0.5
+
+
+def match_persons(a, b):
+    """人物矩形の中心が近い順に対応付ける → [(a の番号, b の番号), ...]"""
+    if a.num_persons == 0 or b.num_persons == 0:
+        return []
+    ca = (a.boxes[:, :2] + a.boxes[:, 2:4]) / 2
+    cb = (b.boxes[:, :2] + b.boxes[:, 2:4]) / 2
+    dist = np.linalg.norm(ca[:, None, :] - cb[None, :, :], axis=-1)
+    pairs = []
+    used_a, used_b = set(), set()
+    for flat in np.argsort(dist, axis=None):
+        i, j = np.unravel_index(flat, dist.shape)
+        if i in used_a or j in used_b:
+            continue
+        pairs.append((int(i), int(j)))
+        used_a.add(i)
+        used_b.add(j)
+    return pairs
+
+
+def timed_estimate(estimator, paths):
+    results, times = [], []
+    for path in paths:
+        t0 = time.perf_counter()
+        results.append(estimator.estimate(path))
+        times.append(time.perf_counter() - t0)
+    return results, times
+
+
+def main():
+    p = argparse.ArgumentParser(description="骨格推定の backend 間で結果を比較する")
+    p.add_argument("--backend", default="onnx", choices=["onnx", "openvino"])
+    p.add_argument("--model", default="yolo11n-pose.pt")
+    p.add_argument("--input", default="pose_examples")
+    p.add_argument("--tol", type=float, default=2.0, help="許容するキーポイント座標の最大差（ピクセル）")
+    args = p.parse_args()
+
+    paths = [os.path.join(args.input, f) for f in list_images(args.input)]
+    if not paths:
+        print(f"画像がありません: {args.input}")
+        return 1
+
+    # キャッシュは使わない（毎回実際に推論して比べる）
+    ref = PoseEstimator(PoseEstimatorConfig(model_path=args.model, backend="torch"))
+    alt = PoseEstimator(PoseEstimatorConfig(model_path=args.model, backend=args.backend))
+
+    # 初回推論の遅さを計測に含めないよう1枚ずつ空回し
+    ref.estimate(paths[0])
+    alt.estimate(paths[0])
+    ref_results, ref_times = timed_estimate(ref, paths)
+    alt_results, alt_times = timed_estimate(alt, paths)
+
+    print(f"{'image':30s} {'persons':>9s} {'max_dxy':>8s} {'mean_dxy':>9s} {'max_dconf':>10s}")
+    worst = 0.0
+    ok = True
+    for path, a, b in zip(paths, ref_results, alt_results):
+        pairs = match_persons(a, b)
+        if pairs:
+            ia, ib = (list(x) for x in zip(*pairs))
+            dxy = np.linalg.norm(a.xy[ia] - b.xy[ib], axis=-1)
+            if a.conf is not None and b.conf is not None:
+                dconf = np.abs(a.conf[ia] - b.conf[ib])
+                # conf < 0.5 の点は座標が 0 にされるので、両方で見えている点だけ比べる
+                visible = (a.conf[ia] >= VISIBLE_CONF) & (b.conf[ib] >= VISIBLE_CONF)
+                dxy = dxy[visible] if visible.any() else np.zeros(1)
+            else:
+                dconf = np.zeros(1)
+            max_dxy, mean_dxy, max_dconf = float(dxy.max()), float(dxy.mean()), float(dconf.max())
+        else:
+            max_dxy = mean_dxy = max_dconf = 0.0
+        same_count = a.num_persons == b.num_persons
+        ok = ok and same_count and max_dxy <= args.tol
+        worst = max(worst, max_dxy)
+        persons = f"{a.num_persons}/{b.num_persons}" + ("" if same_count else " !")
+        print(f"{os.path.basename(path):30s} {persons:>9s} {max_dxy:8.2f} {mean_dxy:9.2f} {max_dconf:10.4f}")
+
+    print("-" * 70)
+    print(f"torch     : {np.mean(ref_times) * 1000:7.1f} ms/枚")
+    print(f"{args.backend:10s}: {np.mean(alt_times) * 1000:7.1f} ms/枚")
+    print(f"最大座標差: {worst:.2f} px（許容 {args.tol} px） → {'OK' if ok else 'NG'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+フォルダ内の画像をシャードに分け、複数プロセスで並列に骨格推定するコマンド。
+
+- 各プロセスが自分で YOLO を読み込み、使うスレッド数を --threads に固定する
+- 各シャードは FolderPoseExtractor で処理（シャードごとに再開可能）
+- 画像はファイル名のハッシュでシャードに割り振り、どのシャードの manifest にある画像も処理済みとして飛ばす
+  （画像を足したり --workers を変えたりしても、処理済みの画像をやり直さない）
+- 最後にシャードごとの CSV を pose_estimate_multi.py と同じ all_keypoints.csv 1つにまとめる
+  （キーポイントストアも keypoint_store/ 1つにまとめる）
+
+例:
+    python pose_estimate_sharded.py --input single_fullbody_pose --output outputs_multi --workers 8
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+SHARD_CSV = "all_keypoints.shard{:03d}.csv"
+SHARD_MANIFEST = "manifest.shard{:03d}.jsonl"
+SHARD_STORE = "keypoint_store.shard{:03d}"
+MERGED_CSV = "all_keypoints.csv"
+MERGED_STORE = "keypoint_store"
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def _init_worker(threads):
+    """
+    ワーカープロセスの初期化。torch を読み込む前にスレッド数を固定する。
+    onnxruntime / OpenVINO は環境変数では決まらないので、_run_shard で PoseEstimatorConfig.num_threads として渡す。
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+
+    import cv2
+    import torch
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+
+def shard_of(name, num_shards):
+    """ファイル名だけで決まるシャード番号（一覧の中身や順番が変わっても同じ）"""
+    return zlib.crc32(name.encode("utf-8")) % num_shards
+
+
+def existing_shards(save_dir):
+    """save_dir に出力が残っているシャード番号（前回と --workers が違っても拾う）"""
+    ids = set()
+    for path in glob.glob(os.path.join(save_dir, "*.shard*")):
+        m = re.search(r"\.shard(\d+)", os.path.basename(path))
+        if m:
+            ids.add(int(m.group(1)))
+    return ids
+
+
+def processed_images(save_dir):
+    """どれかのシャードの manifest に記録済みの画像名"""
+    done = set()
+    for shard_id in existing_shards(save_dir):
+        path = os.path.join(save_dir, SHARD_MANIFEST.format(shard_id))
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["image"])
+                except (ValueError, KeyError):
+                    continue  # 書き込み途中で止まった行
+    return done
+
+
+def _run_shard(shard_id, files, args):
+    """1シャード分を処理して件数のまとめを返す（ワーカープロセス内で実行）"""
+    from game_test.scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig
+    from game_test.scenes.pose_pipeline import FolderPoseExtractor
+
+    estimator = PoseEstimator(PoseEstimatorConfig(
+        model_path=args["model"],
+        device=args["device"],
+        backend=args["backend"],
+        kpt_radius=5,
+        line_width=2,
+        draw_on_black_bg=True,
+        draw_boxes=True,  # 学習画像（*_pose.png）と同じく人物矩形とラベルも描く
+        batch_size=args["batch_size"],
+        cache_dir=args["cache_dir"],
+        num_threads=args["threads"],
+    ))
+    extractor = FolderPoseExtractor(
+        estimator, args["input"], args["output"],
+        png_name=None if args["no_png"] else "{stem}_pose.png",
+        csv_name=SHARD_CSV.format(shard_id),
+        write_json=not args["no_json"],
+        decode_workers=args["decode_workers"],
+        verbose=False,
+        manifest_name=SHARD_MANIFEST.format(shard_id),
+        store_dir=os.path.join(args["output"], SHARD_STORE.format(shard_id)),
+    )
+    return extractor.run(files=files)
+
+
+def merge_shard_csvs(save_dir, shard_ids, order):
+    """シャードの CSV を1つにまとめる（画像の並びは order の順。複数のシャードにある画像は最初のものだけ使う）"""
+    import pandas as pd
+
+    frames = []
+    seen = set()
+    for shard_id in sorted(shard_ids):
+        path = os.path.join(save_dir, SHARD_CSV.format(shard_id))
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            df = pd.read_csv(path, encoding="utf-8")
+            df = df[~df["image"].isin(seen)]
+            seen.update(df["image"].unique())
+            frames.append(df)
+    if not frames:
+        return None
+
+    df = pd.concat(frames, ignore_index=True)
+    rank = {name: i for i, name in enumerate(order)}
+    df = df.sort_values(
+        by=["image", "person_id", "keypoint_id"],
+        key=lambda col: col.map(rank) if col.name == "image" else col,
+        kind="stable",
+    )
+    csv_path = os.path.join(save_dir, MERGED_CSV)
+    df.to_csv(csv_path, index=False, encoding="utf-8")
+    return csv_path
+
+
+def merge_shard_stores(save_dir, shard_ids, order):
+    """シャードの KeypointStore を1つにまとめる（画像の並びは order の順, 既にある画像は飛ばす）"""
+    from game_test.scenes.keypoint_store import KeypointStore
+
+    shards = [KeypointStore(os.path.join(save_dir, SHARD_STORE.format(i))) for i in sorted(shard_ids)]
+    merged = KeypointStore(os.path.join(save_dir, MERGED_STORE))
+    for name in order:
+        for shard in shards:
+            if name in shard:
+                kpts, width, height = shard.get(name)
+                merged.append(name, kpts, width, height)
+                break
+    return merged
+
+
+def parse_args():
+    cpu = os.cpu_count() or 1
+    p = argparse.ArgumentParser(description="シャード分割＋マルチプロセスで骨格推定を行う")
+    p.add_argument("--input", default="pose_examples", help="入力画像フォルダ")
+    p.add_argument("--output", default="outputs_multi", help="出力フォルダ")
+    p.add_argument("--model", default="yolo11n-pose.pt")
+    p.add_argument("--device", default=None, help='"cpu" / "cuda"（省略時は CPU）')
+    p.add_argument("--backend", default="torch", choices=["torch", "onnx", "openvino"],
+                   help="推論ランタイム（CPU なら onnx / openvino が速い）")
+    p.add_argument("--workers", type=int, default=max(1, cpu // 2), help="プロセス数 = シャード数")
+    p.add_argument("--threads", type=int, default=None, help="1プロセスあたりのスレッド数（省略時は コア数 / workers）")
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--decode-workers", type=int, default=2, help="1プロセスあたりのデコード用スレッド数")
+    p.add_argument("--cache-dir", default=".pose_cache", help='推論結果キャッシュ（"" で無効）')
+    p.add_argument("--no-png", action="store_true", help="骨格画像を書き出さない")
+    p.add_argument("--no-json", action="store_true", help="画像ごとの JSON を書き出さない")
+    args = p.parse_args()
+    if args.threads is None:
+        args.threads = max(1, cpu // max(1, args.workers))
+    return args
+
+
+def main():
+    args = parse_args()
+    from game_test.scenes.pose_estimate import resolve_model_path
+    from game_test.scenes.pose_pipeline import list_images
+
+    # onnx / openvino への書き出しは各プロセスが同時にやらないよう、先に1回だけ行う
+    resolve_model_path(args.model, args.backend)
+
+    files = list_images(args.input)
+    os.makedirs(args.output, exist_ok=True)
+    done = processed_images(args.output)
+    todo = [name for name in files if name not in done]
+    num_shards = max(1, args.workers)
+    # シャード分けはファイル名のハッシュで決める（画像が増えても既存の画像のシャードは変わらない）
+    shards = {}
+    for name in todo:
+        shards.setdefault(shard_of(name, num_shards), []).append(name)
+
+    print(f"画像 {len(files)}枚（処理済み {len(files) - len(todo)}枚をスキップ）を "
+          f"{len(shards)}シャードで処理（1プロセス {args.threads}スレッド）")
+    shard_args = {
+        "input": args.input, "output": args.output, "model": args.model, "device": args.device,
+        "backend": args.backend, "threads": args.threads,
+        "batch_size": args.batch_size, "decode_workers": args.decode_workers,
+        "cache_dir": args.cache_dir or None, "no_png": args.no_png, "no_json": args.no_json,
+    }
+
+    started = time.perf_counter()
+    totals = {}
+    # torch をフォークで複製しないよう spawn を使う
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max(1, len(shards)), mp_context=ctx,
+        initializer=_init_worker, initargs=(args.threads,),
+    ) as pool:
+        futures = {
+            pool.submit(_run_shard, shard_id, shard, shard_args): shard_id
+            for shard_id, shard in sorted(shards.items())
+        }
+        for fut in as_completed(futures):
+            stats = fut.result()
+            print(f"シャード {futures[fut]} 完了: {stats}")
+            for k, v in stats.items():
+                totals[k] = totals.get(k, 0) + v
+
+    shard_ids = existing_shards(args.output)
+    csv_path = merge_shard_csvs(args.output, shard_ids, files)
+    store = merge_shard_stores(args.output, shard_ids, files)
+    elapsed = time.perf_counter() - started
+    print(f"合計: {totals}（{elapsed:.1f}秒）")
+    print(f"キーポイントストア: {store.root}（{len(store)}枚 / {store.num_persons}人）")
+    if csv_path:
+        print(f"まとめCSVを保存: {csv_path}")
+    else:
+        print("有効なキーポイント検出がありませんでした。")
+
+
+if __name__ == "__main__":
+    main()
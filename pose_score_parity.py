@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+ゲームの採点入力（PoseScorePipeline: メモリ上で描いて縮小）が、得点モデルの学習入力と同じスコアになるかを確認する。
+
+元写真ごとに、次の3つの骨格画像を同じ ScorePredictor で採点して比べる。
+
+- pipeline : PoseScorePipeline.render_batch（Config.SCORE_FROM_POSE=True の時にゲームが採点する画像）
+- plot     : 同じ推論結果を Results.plot で黒背景に描いたもの（学習画像を作った poseestimate.py の描き方）
+- train    : --train-dir にある実際の学習画像 "<元画像名>_pose.png"（あれば）
+
+pipeline と plot / train のスコア差（0〜10）を表示し、最大差が --tol を超えたら終了コード 1 を返す。
+OK になってから game_test/common.py の Config.SCORE_FROM_POSE を True にする。
+
+例:
+    python pose_score_parity.py --input single_fullbody_pose --limit 100
+    python pose_score_parity.py --input pose_examples --train-dir ""   # 学習画像が無い写真で plot とだけ比べる
+"""
+
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+
+from game_test.scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig
+from game_test.scenes.pose_pipeline import list_images
+from game_test.scenes.pose_score import PoseScorePipeline
+from game_test.scenes.score_predictor import ScorePredictor
+from score_labels import image_key
+from skeleton_render_parity import KPT_RADIUS, LINE_WIDTH, plot_reference
+
+
+def score_row(scores, names):
+    return np.array([scores[n] for n in names])
+
+
+def main():
+    p = argparse.ArgumentParser(description="ゲームの採点入力と学習入力のスコアを比較する")
+    p.add_argument("--model", default="yolo11n-pose.pt")
+    p.add_argument("--score-backend", default="keras", choices=["keras", "tflite"])
+    p.add_argument("--input", default="single_fullbody_pose", help="元写真のフォルダ")
+    p.add_argument("--train-dir", default="single_fullbody_pose_black_bg", help="学習画像のフォルダ（空なら比べない）")
+    p.add_argument("--limit", type=int, default=100, help="比べる写真の枚数（無作為に選ぶ）")
+    p.add_argument("--tol", type=float, default=0.1, help="許容するスコアの最大差（0〜10）")
+    args = p.parse_args()
+
+    names_in_dir = list_images(args.input)
+    random.Random(42).shuffle(names_in_dir)
+    paths = [os.path.join(args.input, f) for f in names_in_dir[:args.limit]]
+    if not paths:
+        print(f"画像がありません: {args.input}")
+        return 1
+
+    # ゲーム（ScoringService._pose_pipeline）と同じ設定
+    estimator = PoseEstimator(PoseEstimatorConfig(
+        model_path=args.model,
+        kpt_radius=KPT_RADIUS,
+        line_width=LINE_WIDTH,
+        draw_on_black_bg=True,
+        draw_boxes=True,
+    ))
+    # 学習画像は "xxx_pose.png" なので、元写真とは image_key で対応させる
+    train_files = {}
+    if args.train_dir and os.path.isdir(args.train_dir):
+        train_files = {image_key(f): os.path.join(args.train_dir, f) for f in list_images(args.train_dir)}
+
+    predictor = ScorePredictor(backend=args.score_backend)
+    pipeline = PoseScorePipeline(estimator, predictor)
+    names = predictor.TARGET_ORDER
+
+    diffs = {"plot": [], "train": []}
+    print(f"{'image':30s} {'vs plot':>8s} {'vs train':>9s}")
+    for path in paths:
+        res = estimator.model.predict(source=path, device=estimator.cfg.device, verbose=False)[0]
+        result = estimator._to_info(res.orig_img, path, res)
+        if result.num_persons == 0:
+            print(f"{os.path.basename(path):30s} 人物なし（比較しない）")
+            continue
+
+        pipeline_scores, plot_scores = predictor.predict_batch(
+            [pipeline.render_batch([result])[0], plot_reference(res)]
+        )
+        ours = score_row(pipeline_scores, names)
+        cells = []
+        d = np.abs(ours - score_row(plot_scores, names))
+        diffs["plot"].append(d)
+        cells.append(f"{d.max():8.4f}")
+
+        train_path = train_files.get(image_key(path))
+        if train_path is not None:
+            # 学習画像は Results.plot の PNG。ScorePredictor は学習時と同じく cv2.imread → resize で読む
+            d = np.abs(ours - score_row(predictor.predict(train_path), names))
+            diffs["train"].append(d)
+            cells.append(f"{d.max():9.4f}")
+        else:
+            cells.append(f"{'-':>9s}")
+        print(f"{os.path.basename(path):30s} " + " ".join(cells))
+
+    if not diffs["plot"]:
+        print("人物が写っている画像がありません")
+        return 1
+
+    print("-" * 62)
+    print(f"{'':10s} " + " ".join(f"{n:>8s}" for n in names) + f" {'max':>8s} {'枚数':>6s}")
+    worst = 0.0
+    for label, rows in diffs.items():
+        if not rows:
+            continue
+        rows = np.array(rows)
+        worst = max(worst, float(rows.max()))
+        print(f"MAE {label:6s} " + " ".join(f"{v:8.4f}" for v in rows.mean(axis=0))
+              + f" {rows.max():8.4f} {len(rows):6d}")
+    if not diffs["train"]:
+        print(f"学習画像（{args.train_dir or '指定なし'}）が見つからないため、plot とだけ比べました")
+    ok = worst <= args.tol
+    print(f"最大差: {worst:.4f}（許容 {args.tol}） → {'OK' if ok else 'NG'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
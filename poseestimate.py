@@ -1,44 +1,28 @@
-from ultralytics import YOLO
-import cv2
-import numpy as np
-import matplotlib.pyplot as plt
-import os
+from game_test.scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig
+from game_test.scenes.pose_pipeline import FolderPoseExtractor, list_images
 
 # モデルのロード
-model = YOLO("yolo11n-pose.pt")
+estimator = PoseEstimator(PoseEstimatorConfig(
+    model_path="yolo11n-pose.pt",
+    kpt_radius=5,
+    line_width=2,
+    draw_on_black_bg=True,
+    draw_boxes=True,  # 学習画像（*_pose.png）と同じく人物矩形とラベルも描く
+    cache_dir=".pose_cache",  # 同じ画像の再実行は YOLO を回さずキャッシュから読む
+    batch_size=8,  # 1回の推論にまとめる枚数
+))
 
 # 入力画像フォルダ
 image_dir = "images"
 save_dir = "pose_black_bg"
-os.makedirs(save_dir, exist_ok=True)
 
-for img_file in os.listdir(image_dir):
-    if not img_file.lower().endswith((".jpg", ".png")):
-        continue
-
-    img_path = os.path.join(image_dir, img_file)
-    results = model(img_path)
-
-    if results[0].keypoints is None or len(results[0].keypoints) == 0:
-        print(f"スキップ: {img_file}（キーポイントなし）")
-        continue
-
-    # 元画像サイズを取得して黒背景を作成
-    orig = cv2.imread(img_path)
-    h, w, _ = orig.shape
-    black_bg = np.zeros((h, w, 3), dtype=np.uint8)
-
-    # YOLOの描画機能を使って骨格＋キーポイントを描画
-    # plot() 内部では colors と skeleton 情報を自動参照して描画
-    # black_bg に人物を合成せず、推定結果のみを上に描く
-    drawn = results[0].plot(img=black_bg.copy(), kpt_radius=5, line_width=2)
-
-    # 保存
-    save_path = os.path.join(save_dir, img_file)
-    cv2.imwrite(save_path, drawn)
-    print(f"保存: {save_path}")
-
-    # 表示（必要なら）
-    plt.imshow(cv2.cvtColor(drawn, cv2.COLOR_BGR2RGB))
-    plt.axis("off")
-    plt.show()
+# 元画像サイズの黒背景に、推定結果（骨格＋キーポイント）のみを描いて同じファイル名で保存
+# （1枚ごとに plt.show() で止まらないよう、表示はしない。途中で止めても続きから再開できる）
+extractor = FolderPoseExtractor(
+    estimator, image_dir, save_dir,
+    png_name="{name}",
+    csv_name=None,
+    write_json=False,
+    decode_workers=4,
+)
+extractor.run(files=list_images(image_dir, exts=(".jpg", ".png")))
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+学習用データセット（骨格画像 + Excel のスコア）を、128x128 にリサイズ済みの1つの配列として保存する。
+
+ディレクトリ構成:
+
+    meta.json    … 画像数・画像サイズ・ラベル列名（ここに書かれた件数までが有効）
+    index.json   … 画像ごとの [ファイル名, Excel の行番号, 更新日時, サイズ, sha1]（images.u8 と同じ順）
+    images.u8    … (画像数, 128, 128, 3) uint8 BGR（np.memmap でそのまま読める）
+    labels.f32   … (画像数, ラベル列数) float32（Excel の値そのまま, 0〜10）
+
+画像と Excel の行は、Excel のファイル名の列（filename など。score_labels.FILENAME_COLUMNS）か、
+--mapping で渡す対応表の CSV（name, row の2列）で対応させる。os.listdir の順番では対応させない
+（画像を足したり名前を変えたりすると行がずれるため）。どちらも無ければ新しい画像は追加しない。
+Excel の行数がキャッシュに記録した行番号より少なくなっていたら、データセットを作り直す。
+作り直しは、増えた画像と中身が変わった画像（更新日時かサイズが違い、sha1 も違うもの）だけを行う。
+
+例:
+    python score_dataset.py        # single_fullbody_pose_black_bg + newcoolness_scores.xlsx から作る / 更新する
+    python score_dataset.py --mapping image_rows.csv   # Excel にファイル名の列が無い時
+"""
+
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from score_labels import SCORE_COLUMNS, LabelStore, file_sha1, image_key
+
+DATASET_DIR = "dataset_cache"
+IMG_DIR = "single_fullbody_pose_black_bg"
+EXCEL_PATH = "newcoolness_scores.xlsx"
+IMAGE_SIZE = 128
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+LABEL_COLUMNS = SCORE_COLUMNS
+
+
+def load_resized(path, size=IMAGE_SIZE):
+    """学習スクリプトと同じ cv2 の読み込み＋リサイズ（日本語パスでも読めるよう imdecode を使う）"""
+    image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    return cv2.resize(image, (size, size))
+
+
+def image_rows(labels, filename_column=None, mapping_path=None):
+    """
+    image_key(ファイル名) → Excel の行番号。
+    mapping_path（name, row の2列の CSV）があればそれを、無ければ Excel のファイル名の列を使う。
+    どちらも無ければ None（画像と行を対応させる手がかりがない）。
+    """
+    if mapping_path is None:
+        return labels.rows_by_image(filename_column)
+    rows = {}
+    with open(mapping_path, "r", encoding="utf-8", newline="") as f:
+        for record in csv.DictReader(f):
+            row = int(record["row"])
+            if not 0 <= row < len(labels):
+                print(f"警告: {mapping_path} の {record['name']} の行 {row} は Excel にありません（{len(labels)}行）")
+                continue
+            rows[image_key(record["name"])] = row
+    return rows
+
+
+class ScoreDataset:
+    META = "meta.json"
+    INDEX = "index.json"
+    IMAGES = "images.u8"
+    LABELS = "labels.f32"
+
+    def __init__(self, root=DATASET_DIR):
+        self.root = root
+        self.size = IMAGE_SIZE
+        self.columns = list(LABEL_COLUMNS)
+        self.entries = []  # index.json の中身（images.u8 と同じ順）
+
+        meta_path = os.path.join(root, self.META)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.size = meta["size"]
+            self.columns = meta["columns"]
+            with open(os.path.join(root, self.INDEX), "r", encoding="utf-8") as f:
+                self.entries = json.load(f)[:meta["num_images"]]
+
+    # -------------------------
+    # 読み込み（memmap）
+    # -------------------------
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def names(self):
+        return [e["name"] for e in self.entries]
+
+    @property
+    def rows(self):
+        """各画像が対応する Excel の行番号"""
+        return np.array([e["row"] for e in self.entries], dtype=np.int64)
+
+    @property
+    def images(self):
+        """(画像数, size, size, 3) uint8 BGR"""
+        shape = (len(self), self.size, self.size, 3)
+        if not self.entries:
+            return np.zeros(shape, dtype=np.uint8)
+        return np.memmap(os.path.join(self.root, self.IMAGES), dtype=np.uint8, mode="r", shape=shape)
+
+    @property
+    def labels(self):
+        """(画像数, ラベル列数) float32（Excel の値そのまま）"""
+        shape = (len(self), len(self.columns))
+        if not self.entries:
+            return np.zeros(shape, dtype=np.float32)
+        return np.fromfile(os.path.join(self.root, self.LABELS), dtype=np.float32).reshape(shape)
+
+    def label(self, column):
+        return self.labels[:, self.columns.index(column)]
+
+    # -------------------------
+    # 作成・更新
+    # -------------------------
+    def build(self, img_dir=IMG_DIR, excel_path=EXCEL_PATH, workers=4, labels=None,
+              filename_column=None, mapping_path=None):
+        """
+        img_dir と Excel からデータセットを作る / 更新して、件数のまとめを返す。
+        labels: 読み込み済みの LabelStore（省略時は excel_path のキャッシュを開く）
+        filename_column / mapping_path: 画像と Excel の行の対応に使う列名 / 対応表の CSV（image_rows を参照）
+        """
+        os.makedirs(self.root, exist_ok=True)
+        labels = labels if labels is not None else LabelStore(excel_path).load()
+        missing = [c for c in self.columns if c not in labels]
+        if missing:
+            raise ValueError(f"Excel に {missing} という列がありません（存在する列名: {labels.columns}）")
+
+        rows_by_key = image_rows(labels, filename_column, mapping_path)
+        if rows_by_key is None:
+            print("警告: Excel にファイル名の列がなく対応表（--mapping）もないため、新しい画像は追加しません")
+        if any(e["row"] >= len(labels) for e in self.entries):
+            # 行が消えた Excel では記録した行番号が信用できないので、最初から作り直す
+            print(f"Excel の行数（{len(labels)}）がキャッシュの行番号より少ないため、データセットを作り直します")
+            self.entries = []
+            self._truncate_to_index()
+            self._write_index()
+
+        known = {e["name"]: e for e in self.entries}
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+        # 今あるファイル → Excel の行
+        current = {}
+        name_of_row = {}
+        for name in sorted(os.listdir(img_dir)):
+            if not name.lower().endswith(IMAGE_EXTS):
+                continue
+            if rows_by_key is not None:
+                row = rows_by_key.get(image_key(name))
+            else:
+                row = known[name]["row"] if name in known else None
+            if row is None:
+                print(f"警告: {name} に対応する Excel の行がないため使いません")
+                continue
+            if row in name_of_row:
+                print(f"警告: {name} と {name_of_row[row]} が Excel の同じ行 {row} に対応するため、{name} は使いません")
+                continue
+            current[name] = row
+            name_of_row[row] = name
+
+        # 消えた画像を除く（images.u8 を詰め直す）
+        kept = [e for e in self.entries if e["name"] in current]
+        stats["removed"] = len(self.entries) - len(kept)
+        if stats["removed"]:
+            self._compact(kept)
+
+        # 変わった画像・増えた画像を探す
+        slot_of = {e["name"]: slot for slot, e in enumerate(self.entries)}
+        todo = []  # (slot or None, entry)
+        for name, row in current.items():
+            path = os.path.join(img_dir, name)
+            st = os.stat(path)
+            entry = known.get(name)
+            if entry is not None:
+                entry["row"] = row  # Excel の行が並べ替えられていても画像の中身は読み直さなくてよい
+            if entry is not None and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                stats["unchanged"] += 1
+                continue
+            sha1 = file_sha1(path)
+            if entry is not None and entry["sha1"] == sha1:
+                # 中身は同じ（コピーし直しただけ等）なので記録だけ直す
+                entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+                stats["unchanged"] += 1
+                continue
+            new_entry = {"name": name, "row": row, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": sha1}
+            todo.append((slot_of.get(name), new_entry))
+
+        self._truncate_to_index()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            resized = pool.map(lambda item: load_resized(os.path.join(img_dir, item[1]["name"]), self.size), todo)
+            with open(os.path.join(self.root, self.IMAGES), "r+b" if self.entries else "wb") as f:
+                for (slot, entry), image in zip(todo, resized):
+                    if image is None:
+                        print(f"画像の読み込みに失敗しました: {entry['name']}")
+                        stats["failed"] += 1
+                        continue
+                    if slot is None:
+                        f.seek(len(self.entries) * image.nbytes)
+                        f.write(image.tobytes())
+                        self.entries.append(entry)
+                        stats["added"] += 1
+                    else:
+                        f.seek(slot * image.nbytes)
+                        f.write(image.tobytes())
+                        self.entries[slot] = entry
+                        stats["updated"] += 1
+
+        self._write_labels(labels)
+        self._write_index()
+        return stats
+
+    def _image_bytes(self):
+        return self.size * self.size * 3
+
+    def _compact(self, kept):
+        """残す画像だけを前から詰めて images.u8 を書き直す"""
+        images = self.images
+        slot_of = {e["name"]: slot for slot, e in enumerate(self.entries)}
+        path = os.path.join(self.root, self.IMAGES)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for entry in kept:
+                f.write(np.ascontiguousarray(images[slot_of[entry["name"]]]).tobytes())
+        del images
+        os.replace(tmp_path, path)
+        self.entries = kept
+        self._write_index()
+
+    def _truncate_to_index(self):
+        """index.json より後ろにある書きかけの画像を切り詰める"""
+        path = os.path.join(self.root, self.IMAGES)
+        size = len(self.entries) * self._image_bytes()
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _write_labels(self, labels):
+        rows = self.rows
+        if rows.size and rows.max() >= len(labels):
+            raise ValueError(f"Excel の行数（{len(labels)}）より後ろの行 {int(rows.max())} を参照しています")
+        table = labels.scores(self.columns)[rows]
+        path = os.path.join(self.root, self.LABELS)
+        table.astype(np.float32).tofile(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def _write_index(self):
+        for filename, data in (
+            (self.INDEX, self.entries),
+            (self.META, {"num_images": len(self.entries), "size": self.size, "columns": self.columns}),
+        ):
+            path = os.path.join(self.root, filename)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+
+
+def main():
+    p = argparse.ArgumentParser(description="学習用データセットのキャッシュを作る / 更新する")
+    p.add_argument("--img-dir", default=IMG_DIR)
+    p.add_argument("--excel", default=EXCEL_PATH)
+    p.add_argument("--root", default=DATASET_DIR)
+    p.add_argument("--workers", type=int, default=4, help="デコード用スレッド数")
+    p.add_argument("--filename-column", default=None, help="画像のファイル名が入っている Excel の列名（省略時は自動で探す）")
+    p.add_argument("--mapping", default=None, help="画像と Excel の行の対応表（name, row の2列の CSV）")
+    args = p.parse_args()
+
+    dataset = ScoreDataset(args.root)
+    stats = dataset.build(args.img_dir, args.excel, workers=args.workers,
+                          filename_column=args.filename_column, mapping_path=args.mapping)
+    print(f"{stats} → {len(dataset)}枚（{dataset.root}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+newcoolness_scores.xlsx のラベルを列ごとの配列にして保存しておき、2回目以降は Excel を読まずに使う。
+
+pd.read_excel は遅いので、ワークブックの更新日時・サイズが前回と同じならキャッシュをそのまま開く。
+更新日時が変わっていても中身の sha1 が同じならキャッシュを使い、違う時だけ Excel を読み直す。
+
+ディレクトリ構成:
+
+    meta.json     … 元の Excel のパス・更新日時・サイズ・sha1、行数と列名
+    columns.npz   … 列ごとの配列（ファイル名の列は文字列、数値は float64 / int64、それ以外は文字列）
+
+例:
+    python score_labels.py        # キャッシュを作る / 更新して、スコア列の統計を表示する
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+LABEL_CACHE_DIR = "label_cache"
+EXCEL_PATH = "newcoolness_scores.xlsx"
+# Excel の列名 → ScorePredictor でのスコア名（この順で出力を並べる）
+TARGETS = {"avg_dynamic": "Dynamic", "avg_stable": "Stable", "avg_unique": "Unique"}
+SCORE_COLUMNS = list(TARGETS)
+# 画像のファイル名が入っている列（この順で探す）
+FILENAME_COLUMNS = ("filename", "file_name", "image", "image_name", "file")
+# columns.npz の保存形式を変えたら上げる（古いキャッシュは Excel から読み直す）
+CACHE_VERSION = 2
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_key(name):
+    """"xxx_pose.png" と "xxx.jpg" を同じ画像として扱うためのキー（フォルダと拡張子も無視する）"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem[:-len("_pose")] if stem.endswith("_pose") else stem
+
+
+def name_text(value):
+    """ファイル名の列の1セルを文字列にする（1.0 のような数値の ID は "1"、空欄は ""）"""
+    if value is None or (isinstance(value, (float, np.floating)) and np.isnan(value)):
+        return ""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _typed(series):
+    """列を型の決まった配列にする（小数は float64、整数は int64、それ以外は文字列。ID が丸まらないよう float32 にしない）"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=bool)
+    if pd.api.types.is_integer_dtype(series):
+        return series.to_numpy(dtype=np.int64)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float64)
+    return series.fillna("").astype(str).to_numpy(dtype=str)
+
+
+def _names(series):
+    """ファイル名の列を文字列の配列にする（数値の ID や空欄も name_text でそろえる）"""
+    return np.array([name_text(v) for v in series], dtype=str)
+
+
+class LabelStore:
+    META = "meta.json"
+    COLUMNS = "columns.npz"
+
+    def __init__(self, excel_path=EXCEL_PATH, root=LABEL_CACHE_DIR):
+        self.excel_path = excel_path
+        self.root = root
+        self.num_rows = 0
+        self.columns = []
+        self._arrays = None
+
+    def load(self):
+        """キャッシュが新しければそれを開き、古ければ Excel を読み直して保存する（self を返す）"""
+        st = os.stat(self.excel_path)
+        meta = self._read_meta()
+        if (meta is not None and meta.get("version") == CACHE_VERSION
+                and meta["excel"] == os.path.abspath(self.excel_path)):
+            if meta["mtime_ns"] == st.st_mtime_ns and meta["size"] == st.st_size:
+                return self._open(meta)
+            sha1 = file_sha1(self.excel_path)
+            if meta["sha1"] == sha1:
+                # 中身は同じ（保存し直しただけ等）なので記録だけ直す
+                meta.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+                self._write_meta(meta)
+                return self._open(meta)
+        else:
+            sha1 = file_sha1(self.excel_path)
+
+        print(f"Excel を読み込んでいます: {self.excel_path}")
+        df = pd.read_excel(self.excel_path)
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, self.COLUMNS)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **{
+            f"c{i}": _names(df[col]) if str(col) in FILENAME_COLUMNS else _typed(df[col])
+            for i, col in enumerate(df.columns)
+        })
+        os.replace(tmp_path, path)
+
+        meta = {
+            "version": CACHE_VERSION,
+            "excel": os.path.abspath(self.excel_path),
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha1": sha1,
+            "num_rows": len(df),
+            "columns": [str(c) for c in df.columns],
+        }
+        self._write_meta(meta)
+        return self._open(meta)
+
+    # -------------------------
+    # 読み出し
+    # -------------------------
+    def __len__(self):
+        return self.num_rows
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def column(self, name):
+        """1列分の配列（必要になった列だけ読み込む）"""
+        if name not in self.columns:
+            raise KeyError(f"'{name}' という列がありません（存在する列名: {self.columns}）")
+        return self._arrays[f"c{self.columns.index(name)}"]
+
+    def scores(self, columns=SCORE_COLUMNS):
+        """(行数, 列数) float32 のスコア表"""
+        return np.stack([self.column(c).astype(np.float32) for c in columns], axis=1)
+
+    def filename_column(self, name=None):
+        """画像のファイル名の列名（name を省略すると FILENAME_COLUMNS から探す。無ければ None）"""
+        if name is not None:
+            if name not in self.columns:
+                raise KeyError(f"'{name}' という列がありません（存在する列名: {self.columns}）")
+            return name
+        return next((c for c in FILENAME_COLUMNS if c in self.columns), None)
+
+    def rows_by_image(self, name=None):
+        """image_key(ファイル名) → 行番号。ファイル名の列が無ければ None"""
+        column = self.filename_column(name)
+        if column is None:
+            return None
+        rows = {}
+        for row, filename in enumerate(self.column(column)):
+            filename = name_text(filename)
+            if not filename or filename.lower() == "nan":
+                continue  # 末尾の空行など
+            key = image_key(filename)
+            if key in rows:
+                print(f"警告: Excel の {rows[key]} 行目と {row} 行目が同じ画像 {filename} です（先の行を使います）")
+                continue
+            rows[key] = row
+        return rows
+
+    def stats(self, columns=SCORE_COLUMNS):
+        """列ごとの 件数 / 最小 / 最大 / 平均 / 標準偏差（NaN は除く）"""
+        result = {}
+        for name in columns:
+            values = self.column(name).astype(np.float64)
+            values = values[~np.isnan(values)]
+            result[name] = {
+                "count": int(values.size),
+                "min": float(values.min()) if values.size else float("nan"),
+                "max": float(values.max()) if values.size else float("nan"),
+                "mean": float(values.mean()) if values.size else float("nan"),
+                "std": float(values.std()) if values.size else float("nan"),
+            }
+        return result
+
+    def frame(self):
+        """pandas の DataFrame に戻す（read_excel の結果と同じ列順）"""
+        return pd.DataFrame({name: self.column(name) for name in self.columns})
+
+    # -------------------------
+    # 内部
+    # -------------------------
+    def _open(self, meta):
+        self.num_rows = meta["num_rows"]
+        self.columns = meta["columns"]
+        self._arrays = np.load(os.path.join(self.root, self.COLUMNS))
+        return self
+
+    def _read_meta(self):
+        path = os.path.join(self.root, self.META)
+        if not os.path.exists(path) or not os.path.exists(os.path.join(self.root, self.COLUMNS)):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        path = os.path.join(self.root, self.META)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Excel のラベルをキャッシュして統計を表示する")
+    p.add_argument("--excel", default=EXCEL_PATH)
+    p.add_argument("--root", default=LABEL_CACHE_DIR)
+    args = p.parse_args()
+
+    store = LabelStore(args.excel, args.root).load()
+    print(f"{len(store)}行 / 列: {store.columns}")
+    for name, s in store.stats([c for c in SCORE_COLUMNS if c in store]).items():
+        print(f"{name:12s} n={s['count']:5d} min={s['min']:6.2f} max={s['max']:6.2f} "
+              f"mean={s['mean']:6.2f} std={s['std']:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""
+得点モデル（VGG16 + 回帰ヘッド）の学習で共通に使う部品。
+
+model_*.py は VGG16 の後ろ4層（block5）以外を固定して学習しているので、
+固定部分（block4_pool まで）の出力はエポックをまたいでも変わらない。
+そこで固定部分の出力を最初に1回だけ計算して float16 の memmap に保存し、
+以降は block5 + ヘッドだけを学習する。
+データ拡張を使う時は毎回入力画像が変わるので、従来通りモデル全体で学習する。
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import Input, Model, Sequential
+from tensorflow.keras.applications import VGG16
+from tensorflow.keras.applications.vgg16 import preprocess_input
+from tensorflow.keras.layers import (
+    BatchNormalization, Dense, Dropout, GlobalAveragePooling2D, RandomTranslation, RandomZoom,
+)
+from tensorflow.keras.optimizers import Adam
+
+from merge_score_models import clone_layer
+from score_dataset import ScoreDataset, image_rows
+from score_labels import TARGETS, LabelStore, image_key
+
+IMAGE_HEIGHT = 128
+IMAGE_WIDTH = 128
+IMG_DIR = "single_fullbody_pose_black_bg"
+EXCEL_PATH = "newcoolness_scores.xlsx"
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+SHUFFLE_BUFFER = 2048
+
+FEATURE_CACHE_DIR = "feature_cache"
+NUM_TRAINABLE_VGG_LAYERS = 4  # base_model.layers[:-4] を固定
+
+
+# ==========================================
+# データセット
+# ==========================================
+def load_dataset(targets, img_dir=IMG_DIR, excel_path=EXCEL_PATH, limit=None, use_cache=True, update_cache=True):
+    """
+    画像と Excel のラベルを読み、(source, {列名: 0〜1 に正規化したラベル}) を返す。
+
+    use_cache=True なら score_dataset.py のデータセットキャッシュを作成 / 更新し、
+    source はリサイズ済みの (N, 128, 128, 3) uint8 の memmap になる（増えた・変わった画像だけ読み直す）。
+    use_cache=False なら source は画像のパスの配列で、image_dataset が学習中に並列で読む。
+    update_cache=False なら作成済みのキャッシュをそのまま開く（並列に学習する時に同じキャッシュを同時に書かないため）。
+    """
+    if use_cache:
+        dataset = ScoreDataset()
+        if update_cache or not len(dataset):
+            stats = dataset.build(img_dir, excel_path)
+            print(f"データセットキャッシュ: {stats} → {len(dataset)}枚（{dataset.root}）")
+        source = dataset.images
+        raw_labels = {t: dataset.label(t) for t in targets if t in dataset.columns}
+        raw_labels.update({t: None for t in targets if t not in dataset.columns})
+    else:
+        source, raw_labels = _load_paths(targets, img_dir, excel_path)
+
+    missing = [t for t, raw in raw_labels.items() if raw is None]
+    if missing:
+        raise ValueError(f"Excel に {missing} という列がありません")
+    if limit is not None:
+        source = source[:limit]
+    print(f"画像: {len(source)}枚")
+
+    labels = {}
+    for target in targets:
+        raw = np.asarray(raw_labels[target][:len(source)], dtype=np.float32)
+        print(f"[{target}] 最大値: {raw.max()} / 最小値: {raw.min()} / 平均値: {raw.mean()}")
+        # もし最大値が0なら、データがおかしい
+        if raw.max() == 0:
+            raise ValueError(f"正解データ '{target}' がすべて0です。Excelの中身か列名を確認してください。")
+        labels[target] = raw / 10.0  # 正規化 (0-10 -> 0.0-1.0)
+    return source, labels
+
+
+def _load_paths(targets, img_dir, excel_path):
+    """
+    画像のパス一覧と、それぞれに対応する Excel の値を返す。
+    画像と Excel の行は score_dataset.image_rows（Excel のファイル名の列）で対応させる。
+    """
+    labels = LabelStore(excel_path).load()
+    rows_by_key = image_rows(labels)
+    if rows_by_key is None:
+        raise ValueError(f"Excel にファイル名の列がないため画像と行を対応させられません（存在する列名: {labels.columns}）")
+
+    paths = []
+    valid_indices = []  # Excel の対応する行を取得するために必要
+    for image_file in sorted(os.listdir(img_dir)):
+        if not image_file.lower().endswith(IMAGE_EXTS):
+            continue
+        row = rows_by_key.get(image_key(image_file))
+        if row is None:
+            print(f"警告: {image_file} に対応する Excel の行がないため使いません")
+            continue
+        paths.append(os.path.join(img_dir, image_file))
+        valid_indices.append(row)
+
+    raw_labels = {t: labels.column(t)[valid_indices] if t in labels else None for t in targets}
+    return np.array(paths), raw_labels
+
+
+def preprocess(images):
+    """VGG16 用の前処理（元の配列は書き換えない）。images は cv2 と同じ BGR"""
+    return preprocess_input(images.astype(np.float32))
+
+
+def read_image(path):
+    """
+    画像ファイル → (128, 128, 3) uint8 の BGR（cv2.imread + cv2.resize と同じ並び）。
+    ScorePredictor は cv2 の BGR 画像で推論するので、学習でも BGR にそろえる。
+    """
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, (IMAGE_HEIGHT, IMAGE_WIDTH))
+    image = tf.cast(tf.round(tf.clip_by_value(image, 0.0, 255.0)), tf.uint8)
+    return image[..., ::-1]
+
+
+def _is_paths(source):
+    return np.asarray(source).dtype.kind in ("U", "S", "O")
+
+
+def _take(labels, idx):
+    return [y[idx] for y in labels] if isinstance(labels, list) else labels[idx]
+
+
+def source_key(source):
+    """
+    画像が変われば別の値になるキー。
+    パスなら各ファイルの更新日時・サイズから、配列なら中身の sha1 から作る。
+    """
+    h = hashlib.sha1()
+    if _is_paths(source):
+        for path in source:
+            st = os.stat(path)
+            h.update(f"{path}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+    else:
+        h.update(str(source.shape).encode("utf-8"))
+        for start in range(0, len(source), 256):
+            h.update(np.ascontiguousarray(source[start:start + 256]).tobytes())
+    return h.hexdigest()[:16]
+
+
+def array_dataset(array, labels=None, indices=None, batch_size=32, shuffle=False, seed=42):
+    """
+    配列（memmap でよい）から indices の行だけをバッチで読み出す tf.data.Dataset（全体はメモリに載せない）。
+    要素は labels があれば (x, y)、無ければ x。x は float32 にして返す。
+    """
+    if indices is None:
+        indices = np.arange(len(array))
+    multi = isinstance(labels, list)
+    if labels is None:
+        label_matrix = np.zeros((len(array), 0), dtype=np.float32)
+    else:
+        label_matrix = (np.stack(labels, axis=1) if multi else np.asarray(labels)[:, None]).astype(np.float32)
+    item_shape = tuple(array.shape[1:])
+
+    def load(idx):
+        idx = np.sort(idx)  # memmap は前から順に読む方が速い
+        return np.asarray(array[idx], dtype=np.float32), label_matrix[idx]
+
+    def to_tensors(idx):
+        x, y = tf.numpy_function(load, [idx], [tf.float32, tf.float32])
+        x = tf.ensure_shape(x, (None,) + item_shape)
+        if labels is None:
+            return x
+        y = tf.ensure_shape(y, (None, label_matrix.shape[1]))
+        return x, (tuple(y[:, i] for i in range(label_matrix.shape[1])) if multi else y[:, 0])
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(indices))
+    if shuffle:
+        ds = ds.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).map(to_tensors, num_parallel_calls=tf.data.AUTOTUNE)
+
+
+def image_dataset(source, labels=None, indices=None, batch_size=32, shuffle=False, augment=False, cache=True,
+                  cache_dir=FEATURE_CACHE_DIR, seed=42):
+    """
+    学習用の tf.data.Dataset を作る（source は画像のパスの配列か、リサイズ済み uint8 画像の配列）。
+    labels は source と同じ長さで、indices の行だけを流す。
+
+    パスの場合は読み込み＋リサイズを並列に行い、結果（uint8）をディスクにキャッシュして2エポック目以降は読み直さない。
+    その後 シャッフル → バッチ化 →（データ拡張）→ 前処理 → 先読み の順に流す。
+    全画像をメモリに載せないので、画像が増えても使うメモリはほぼ変わらない。
+    """
+    if indices is None:
+        indices = np.arange(len(source))
+
+    if _is_paths(source):
+        paths = np.asarray(source)[indices]
+        ds = tf.data.Dataset.from_tensor_slices(paths).map(read_image, num_parallel_calls=tf.data.AUTOTUNE)
+        if cache:
+            os.makedirs(cache_dir, exist_ok=True)
+            ds = ds.cache(os.path.join(cache_dir, f"images_{source_key(paths)}"))
+        if labels is not None:
+            sub = _take(labels, indices)
+            ds = tf.data.Dataset.zip((ds, tf.data.Dataset.from_tensor_slices(tuple(sub) if isinstance(sub, list) else sub)))
+        else:
+            ds = ds.map(lambda x: (x,))
+        if shuffle:
+            ds = ds.shuffle(min(len(paths), SHUFFLE_BUFFER), seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+    else:
+        ds = array_dataset(source, labels, indices, batch_size, shuffle, seed)
+        if labels is None:
+            ds = ds.map(lambda x: (x,))
+
+    aug = augmenter() if augment else None
+
+    def prepare(x, *y):
+        x = tf.cast(x, tf.float32)
+        if aug is not None:
+            x = aug(x, training=True)
+        x = preprocess_input(x)
+        return (x, *y) if y else x
+
+    return ds.map(prepare, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+# ==========================================
+# モデル
+# ==========================================
+def create_model(learning_rate=1e-5, num_trainable=NUM_TRAINABLE_VGG_LAYERS):
+    """
+    1つのスコアを出すモデル（ScorePredictor / merge_score_models.py / export_score_tflite.py が読む構成）。
+    num_trainable: VGG16 の後ろから何層を学習させるか（4 なら block5）
+    """
+    base_model = VGG16(weights="imagenet", include_top=False, input_shape=(IMAGE_HEIGHT, IMAGE_WIDTH, 3))
+
+    # VGG16の最後の数層だけ学習させる (Unfreezing)
+    base_model.trainable = True
+    for layer in base_model.layers[:len(base_model.layers) - num_trainable]:
+        layer.trainable = False
+
+    model = Sequential([
+        base_model,
+        GlobalAveragePooling2D(),
+        Dense(256, activation="relu"),
+        BatchNormalization(),
+        Dropout(0.5),
+        Dense(1, activation="sigmoid"),
+    ])
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss="mse", metrics=["mae"])
+    return model
+
+
+def _dense_head(x, prefix=None):
+    name = (lambda s: f"{prefix}_{s}") if prefix else (lambda s: None)
+    x = GlobalAveragePooling2D(name=name("gap"))(x)
+    x = Dense(256, activation="relu", name=name("dense"))(x)
+    x = BatchNormalization(name=name("bn"))(x)
+    return Dropout(0.5, name=name("dropout"))(x)
+
+
+def create_multi_model(output_names, per_target_heads=False, learning_rate=1e-5,
+                       num_trainable=NUM_TRAINABLE_VGG_LAYERS):
+    """
+    複数のスコアを1回で出すモデルを作り、(model, trunk, tail) を返す。
+
+    - 既定: block5 と Dense(256) まで3スコアで共有し、最後の Dense(1) だけを分ける
+    - per_target_heads=True: 固定部分（block4_pool まで）だけ共有し、block5 + ヘッドをスコアごとに持つ
+      （merge_score_models.py で3モデルをまとめた時と同じ形）
+
+    trunk は固定部分、tail はその出力から各スコアまで。model = tail(trunk(画像))。
+    num_trainable: VGG16 の後ろから何層を tail に入れて学習させるか（4 なら block5）
+    """
+    base_model = VGG16(weights="imagenet", include_top=False, input_shape=(IMAGE_HEIGHT, IMAGE_WIDTH, 3))
+    num_frozen = len(base_model.layers) - num_trainable
+    trunk = Model(base_model.input, base_model.layers[num_frozen - 1].output, name="shared_trunk")
+    trunk.trainable = False
+    block5 = base_model.layers[num_frozen:]
+
+    features = Input(shape=trunk.output_shape[1:], name="features")
+    outputs = []
+    if per_target_heads:
+        for name in output_names:
+            prefix = name.lower()
+            x = features
+            for layer in block5:
+                clone = clone_layer(layer, prefix)
+                x = clone(x)
+                clone.set_weights(layer.get_weights())  # ImageNet の重みから始める
+            x = _dense_head(x, prefix)
+            outputs.append(Dense(1, activation="sigmoid", name=name)(x))
+    else:
+        x = features
+        for layer in block5:
+            x = layer(x)
+        x = _dense_head(x)
+        outputs = [Dense(1, activation="sigmoid", name=name)(x) for name in output_names]
+    tail = Model(features, outputs, name="score_heads")
+
+    inputs = Input(shape=(IMAGE_HEIGHT, IMAGE_WIDTH, 3), name="image")
+    model = Model(inputs, tail(trunk(inputs)), name="multi_score_model")
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss="mse", metrics=["mae"])
+    return model, trunk, tail
+
+
+# ==========================================
+# 学習
+# ==========================================
+def split_model(model):
+    """
+    model_*.py の create_model() のモデルを (固定部分, 学習する部分) に分ける。
+    層はそのまま共有するので、学習する部分を fit すると元の model の重みも更新される。
+    固定部分は VGG16 の先頭から、最初の学習する層の手前まで（create_model の num_trainable に合わせる）。
+    """
+    base_model = model.layers[0]
+    num_frozen = next((i for i, layer in enumerate(base_model.layers) if layer.trainable), len(base_model.layers))
+    trunk = Model(base_model.input, base_model.layers[num_frozen - 1].output, name="frozen_trunk")
+
+    inputs = Input(shape=trunk.output_shape[1:], name="features")
+    x = inputs
+    for layer in base_model.layers[num_frozen:] + model.layers[1:]:
+        x = layer(x)
+    tail = Model(inputs, x, name="trainable_tail")
+    return trunk, tail
+
+
+def compute_features(trunk, source, name, batch_size=64, cache_dir=FEATURE_CACHE_DIR):
+    """
+    全画像を固定部分に通した出力を float16 の memmap で返す（行は source と同じ順）。
+    同じ画像に対しては2回目以降は計算せず、保存済みのファイルを開くだけ
+    （画像の内容でファイル名を決めるので、model_*.py どうしでも共有される）。
+    """
+    key = source_key(source)
+    path = os.path.join(cache_dir, f"{name}_{trunk.layers[-1].name}_{key}.f16")
+    meta_path = path + ".json"
+    shape = (len(source),) + tuple(trunk.output_shape[1:])
+
+    if os.path.exists(meta_path):
+        print(f"特徴量キャッシュを使います: {path}")
+        return np.memmap(path, dtype=np.float16, mode="r", shape=shape)
+
+    print(f"固定部分の特徴量を計算しています（{len(source)}枚）...")
+    os.makedirs(cache_dir, exist_ok=True)
+    # 並列に学習している別プロセスと同時に作っても壊れないよう、一時ファイルはプロセスごとに分ける
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    out = np.memmap(tmp_path, dtype=np.float16, mode="w+", shape=shape)
+    start = 0
+    for batch in image_dataset(source, batch_size=batch_size, cache=False):
+        out[start:start + len(batch)] = trunk(batch, training=False).numpy().astype(np.float16)
+        start += len(batch)
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"shape": list(shape), "dtype": "float16", "source": key}, f)
+    os.replace(tmp_path, meta_path)
+    return np.memmap(path, dtype=np.float16, mode="r", shape=shape)
+
+
+def augmenter():
+    """人物の位置と大きさを少しずらす（背景は黒なので端の画素で埋める）"""
+    return Sequential([
+        RandomTranslation(0.05, 0.05, fill_mode="nearest"),
+        RandomZoom(0.05, fill_mode="nearest"),
+    ], name="augment")
+
+
+def fit_score_model(model, source, labels, indices=None, name="vgg16", epochs=15, batch_size=32,
+                    validation_split=0.2, augment=False, use_feature_cache=True, split=None, callbacks=None,
+                    verbose="auto"):
+    """
+    画像（パスの配列か uint8 画像の配列）とラベルからモデルを学習する。学習後の model はそのままの構成で保存できる。
+    labels は source と同じ長さで、出力が複数なら出力順のリスト。indices の行だけを学習に使い、
+    validation_split は model.fit と同じく、その後ろの割合を検証用にする。
+
+    augment=False なら固定部分の出力をキャッシュして block5 + ヘッドだけを学習する。
+    augment=True（または use_feature_cache=False）なら tf.data で画像を流してモデル全体で学習する。
+    split: (trunk, tail)。省略時は create_model() の構成として split_model で分ける。
+    callbacks / verbose はそのまま fit に渡し、fit の History を返す。
+    """
+    if indices is None:
+        indices = np.arange(len(source))
+    num_val = int(len(indices) * validation_split)
+    train_idx = indices[:len(indices) - num_val]
+    val_idx = indices[len(indices) - num_val:]
+
+    if augment or not use_feature_cache:
+        train_ds = image_dataset(source, labels, train_idx, batch_size, shuffle=True, augment=augment)
+        val_ds = image_dataset(source, labels, val_idx, batch_size) if num_val else None
+        return model.fit(train_ds, epochs=epochs, validation_data=val_ds, callbacks=callbacks, verbose=verbose)
+
+    trunk, tail = split if split is not None else split_model(model)
+    tail.compile(optimizer=Adam(learning_rate=float(model.optimizer.learning_rate)),
+                 loss=model.loss, metrics=["mae"])
+    features = compute_features(trunk, source, name)
+    train_ds = array_dataset(features, labels, train_idx, batch_size, shuffle=True).prefetch(tf.data.AUTOTUNE)
+    val_ds = array_dataset(features, labels, val_idx, batch_size).prefetch(tf.data.AUTOTUNE) if num_val else None
+    return tail.fit(train_ds, epochs=epochs, validation_data=val_ds, callbacks=callbacks, verbose=verbose)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+SkeletonRenderer（PoseEstimator.draw）の描画が ultralytics の Results.plot と画素単位で一致するかを確認する。
+
+学習画像（single_fullbody_pose_black_bg の *_pose.png）は元々 Results.plot で黒背景に描いたものなので、
+ここがずれると学習画像・ゲームの採点入力とも学習時と違う画像になる。
+
+pose_examples/ の各画像を1回だけ推論し、同じ推論結果を
+- Results.plot(img=黒画像, kpt_radius=5, line_width=2)（poseestimate.py の元の描き方）
+- PoseEstimator.draw(on_black=True)
+で描いて、値が違う画素の割合と最大差を表示する。違う画素の割合が --tol を超えたら終了コード 1 を返す。
+
+例:
+    python skeleton_render_parity.py
+    python skeleton_render_parity.py --save-diff outputs_parity
+"""
+
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from game_test.scenes.pose_estimate import PoseEstimator, PoseEstimatorConfig
+from game_test.scenes.pose_pipeline import list_images
+
+KPT_RADIUS = 5
+LINE_WIDTH = 2
+
+
+def plot_reference(res, kpt_radius=KPT_RADIUS, line_width=LINE_WIDTH):
+    """学習画像を作った時と同じく、Results.plot で黒背景に描く"""
+    black = np.zeros_like(res.orig_img)
+    return res.plot(img=black, kpt_radius=kpt_radius, line_width=line_width)
+
+
+def main():
+    p = argparse.ArgumentParser(description="SkeletonRenderer と Results.plot の描画を画素単位で比較する")
+    p.add_argument("--model", default="yolo11n-pose.pt")
+    p.add_argument("--input", default="pose_examples")
+    p.add_argument("--tol", type=float, default=0.001, help="許容する「値が違う画素」の割合")
+    p.add_argument("--save-diff", default=None, help="差のある画素を白くした画像を保存するフォルダ")
+    args = p.parse_args()
+
+    paths = [os.path.join(args.input, f) for f in list_images(args.input)]
+    if not paths:
+        print(f"画像がありません: {args.input}")
+        return 1
+    if args.save_diff:
+        os.makedirs(args.save_diff, exist_ok=True)
+
+    estimator = PoseEstimator(PoseEstimatorConfig(
+        model_path=args.model,
+        kpt_radius=KPT_RADIUS,
+        line_width=LINE_WIDTH,
+        draw_on_black_bg=True,
+        draw_boxes=True,
+    ))
+
+    print(f"{'image':30s} {'persons':>7s} {'diff_px':>8s} {'ratio':>8s} {'max':>5s}")
+    worst = 0.0
+    for path in paths:
+        res = estimator.model.predict(source=path, device=estimator.cfg.device, verbose=False)[0]
+        # 同じ推論結果から描く（推論を2回すると座標が僅かにずれることがあるため）
+        result = estimator._to_info(res.orig_img, path, res)
+        ref = plot_reference(res)
+        ours = estimator.draw(result, on_black=True)
+
+        diff = cv2.absdiff(ref, ours).max(axis=2)
+        changed = int(np.count_nonzero(diff))
+        ratio = changed / diff.size
+        worst = max(worst, ratio)
+        print(f"{os.path.basename(path):30s} {result.num_persons:7d} {changed:8d} {ratio:8.5f} {int(diff.max()):5d}")
+        if args.save_diff:
+            name = os.path.splitext(os.path.basename(path))[0]
+            cv2.imwrite(os.path.join(args.save_diff, f"{name}_diff.png"), np.where(diff > 0, 255, 0).astype(np.uint8))
+
+    ok = worst <= args.tol
+    print("-" * 62)
+    print(f"違う画素の割合（最大）: {worst:.5f}（許容 {args.tol}） → {'OK' if ok else 'NG'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+得点モデルの学習率・エポック数・バッチサイズ・学習させる VGG16 の層数の組み合わせを、複数プロセスで並列に試す。
+
+1プロセスが使うスレッド数を --threads で決め、CPU のコア数に収まるだけのプロセスを同時に動かす。
+各試行は EarlyStopping（val_loss が --patience エポック改善しなければ打ち切り）付きで学習し、
+検証データの MAE（0〜10 のスコア）と所要時間を、MAE の小さい順に CSV に書く。
+テスト用に分けた 20% は使わないので、決めた設定で train_score_models.py を実行すれば同じテスト MAE と比べられる。
+
+例:
+    python sweep_score_models.py --lr 1e-5 3e-5 1e-4 --unfreeze 4 8 --threads 2
+    python sweep_score_models.py --targets avg_unique --batch-size 16 32 64 --samples 4
+"""
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from score_dataset import ScoreDataset
+# score_training を import すると TensorFlow も読み込まれ、ワーカーのスレッド数の設定より先になるので
+# TARGETS は TensorFlow を使わない score_labels から読む（score_training.TARGETS と同じもの）
+from score_labels import TARGETS
+PARAM_NAMES = ("lr", "epochs", "batch_size", "unfreeze")
+RESULTS_PATH = "sweep_results.csv"
+
+# TensorFlow / BLAS が読む環境変数（import 前に設定しないと効かない）
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS")
+
+
+# ==========================================
+# ワーカープロセス側（TensorFlow はここで初めて import する）
+# ==========================================
+def _init_worker(threads):
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _warm_features(unfreeze, targets, limit):
+    """固定部分の特徴量キャッシュを先に作る（同じ層数の試行が同時に同じ計算をしないように）"""
+    from score_training import compute_features, create_model, load_dataset, split_model
+
+    source, _ = load_dataset(targets, limit=limit, update_cache=False)
+    trunk, _ = split_model(create_model(num_trainable=unfreeze))
+    compute_features(trunk, source, "vgg16")
+    return unfreeze
+
+
+def val_maes(history, output_names):
+    """val_loss が一番小さかったエポックの、スコアごとの検証 MAE（0〜10）"""
+    hist = history.history
+    best = min(range(len(hist["val_loss"])), key=lambda i: hist["val_loss"][i])
+    if len(output_names) == 1:
+        keys = {output_names[0]: "val_mae"}
+    else:
+        keys = {name: f"val_{name}_mae" for name in output_names}
+    return best, {name: hist[key][best] * 10.0 for name, key in keys.items()}
+
+
+def run_trial(trial_id, params, targets, per_target_heads, limit, patience, seed):
+    """1つの組み合わせを学習して結果の1行（dict）を返す。失敗しても例外は投げず error 列に書く"""
+    import numpy as np
+    import tensorflow as tf
+    from sklearn.model_selection import train_test_split
+
+    from score_training import create_model, create_multi_model, fit_score_model, load_dataset
+
+    row = {"trial": trial_id, **params}
+    start = time.perf_counter()
+    try:
+        tf.keras.utils.set_random_seed(seed)
+        output_names = [TARGETS[t] for t in targets]
+        source, labels = load_dataset(targets, limit=limit, update_cache=False)
+        label_matrix = np.stack([labels[t] for t in targets], axis=1)
+        # train_score_models.py と同じ分け方（テスト用の 20% は使わない）
+        train_idx, _ = train_test_split(np.arange(len(source)), test_size=0.2, random_state=42)
+
+        if len(targets) == 1:
+            model = create_model(params["lr"], params["unfreeze"])
+            split = None
+            fit_labels = label_matrix[:, 0]
+        else:
+            model, trunk, tail = create_multi_model(output_names, per_target_heads, params["lr"], params["unfreeze"])
+            split = (trunk, tail)
+            fit_labels = [label_matrix[:, i] for i in range(len(targets))]
+
+        early_stopping = tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=patience,
+                                                          restore_best_weights=True)
+        history = fit_score_model(
+            model, source, fit_labels, train_idx,
+            epochs=params["epochs"], batch_size=params["batch_size"], validation_split=0.2,
+            split=split, callbacks=[early_stopping], verbose=2,
+        )
+        best, maes = val_maes(history, output_names)
+        row.update(
+            val_mae=float(np.mean(list(maes.values()))),
+            **{f"{name}_val_mae": mae for name, mae in maes.items()},
+            best_epoch=best + 1,
+            epochs_run=len(history.history["val_loss"]),
+        )
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["wall_s"] = time.perf_counter() - start
+    return row
+
+
+# ==========================================
+# 親プロセス側
+# ==========================================
+def search_space(args):
+    """コマンドラインで指定した値の全組み合わせ（--samples があればその中から無作為に選ぶ）"""
+    grid = [dict(zip(PARAM_NAMES, values))
+            for values in itertools.product(args.lr, args.epochs, args.batch_size, args.unfreeze)]
+    if args.samples and args.samples < len(grid):
+        grid = random.Random(args.seed).sample(grid, args.samples)
+    return grid
+
+
+def write_results(rows, path, output_names):
+    """MAE の小さい順（失敗した試行は最後）に CSV に書く"""
+    ranked = sorted(rows, key=lambda r: (r.get("val_mae") is None, r.get("val_mae") or 0.0))
+    columns = (["rank", "val_mae"] + [f"{name}_val_mae" for name in output_names]
+               + ["wall_s", "best_epoch", "epochs_run", *PARAM_NAMES, "trial", "error"])
+    with open(path + ".tmp", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for rank, row in enumerate(ranked, 1):
+            writer.writerow({"rank": rank, **row})
+    os.replace(path + ".tmp", path)
+    return ranked
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="得点モデルのハイパーパラメータを並列に探索する")
+    p.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    p.add_argument("--per-target-heads", action="store_true")
+    p.add_argument("--lr", type=float, nargs="+", default=[1e-5, 3e-5, 1e-4])
+    p.add_argument("--epochs", type=int, nargs="+", default=[30], help="上限（EarlyStopping で早く終わることがある）")
+    p.add_argument("--batch-size", type=int, nargs="+", default=[32])
+    p.add_argument("--unfreeze", type=int, nargs="+", default=[4], help="VGG16 の後ろから学習させる層数")
+    p.add_argument("--samples", type=int, default=None, help="全組み合わせから無作為に選んで試す数")
+    p.add_argument("--patience", type=int, default=3, help="val_loss が改善しないまま待つエポック数")
+    p.add_argument("--threads", type=int, default=2, help="1プロセスが使うスレッド数")
+    p.add_argument("--workers", type=int, default=None, help="同時に動かすプロセス数（省略時はコア数 / threads）")
+    p.add_argument("--limit", type=int, default=None, help="使う画像の上限")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--output", default=RESULTS_PATH)
+    args = p.parse_args(argv)
+    args.targets = [t for t in TARGETS if t in args.targets]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_names = [TARGETS[t] for t in args.targets]
+    trials = search_space(args)
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads)
+    print(f"{len(trials)}通りを {workers}プロセス × {args.threads}スレッドで試します")
+
+    # 画像とラベルのキャッシュは親で1回だけ作り、各プロセスは読むだけにする
+    dataset = ScoreDataset()
+    print(f"データセットキャッシュ: {dataset.build()} → {len(dataset)}枚")
+
+    ctx = multiprocessing.get_context("spawn")  # TensorFlow は fork した子プロセスでは安全に動かない
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(args.threads,)) as pool:
+        unfreezes = sorted({t["unfreeze"] for t in trials})
+        for future in as_completed([pool.submit(_warm_features, u, args.targets, args.limit) for u in unfreezes]):
+            print(f"特徴量キャッシュ準備完了（unfreeze={future.result()}）")
+
+        futures = [
+            pool.submit(run_trial, i, params, args.targets, args.per_target_heads, args.limit,
+                        args.patience, args.seed)
+            for i, params in enumerate(trials)
+        ]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            write_results(rows, args.output, output_names)  # 途中で止めても終わった分は残る
+            status = row.get("error") or f"val MAE {row['val_mae']:.3f}"
+            print(f"[{len(rows)}/{len(trials)}] trial {row['trial']} {status}（{row['wall_s']:.0f}秒）")
+
+    ranked = write_results(rows, args.output, output_names)
+    print("=" * 60)
+    print(f"{'rank':>4s} {'val MAE':>8s} {'wall':>7s}  " + " ".join(f"{n:>10s}" for n in PARAM_NAMES))
+    for rank, row in enumerate(ranked[:10], 1):
+        mae = f"{row['val_mae']:8.3f}" if "val_mae" in row else f"{'失敗':>8s}"
+        print(f"{rank:4d} {mae} {row['wall_s']:6.0f}s  " + " ".join(f"{row[n]:>10g}" for n in PARAM_NAMES))
+    print(f"結果: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+骨格画像 + VGG16 の代わりに、キーポイントの座標（51次元）から Dynamic / Stable / Unique を出すモデルを学習する。
+
+キーポイントは pose_estimate_sharded.py（または pose_estimate_multi.py）が作る KeypointStore から読み、
+学習画像（single_fullbody_pose_black_bg の "<元画像名>_pose.png"）とファイル名で対応させる。
+ラベルは score_dataset.py のデータセットキャッシュと同じ Excel の行を使う。
+
+テストには train_score_models.py と同じ分け方（random_state=42 の 20%）を使うので、
+--compare-vgg を付けると同じテスト画像で VGG16 のモデル（ScorePredictor）と誤差・速度を比べられる。
+一番誤差の小さいモデルを model/keypoint_score_model.joblib に保存し、ScorePredictor(backend="keypoints") が読む。
+
+例:
+    python pose_estimate_sharded.py --input single_fullbody_pose --output outputs_multi --no-png
+    python train_keypoint_scorer.py --model mlp gbm --compare-vgg
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.neural_network import MLPRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from game_test.scenes.keypoint_features import CONF_THRESHOLD, keypoint_features
+from game_test.scenes.keypoint_store import KeypointStore
+from score_dataset import ScoreDataset
+from score_labels import TARGETS, image_key
+
+STORE_DIR = "outputs_multi/keypoint_store"
+MODEL_PATH = "model/keypoint_score_model.joblib"
+
+
+def load_keypoint_dataset(store, dataset, conf_threshold=CONF_THRESHOLD):
+    """
+    学習画像ごとに、対応する元画像のキーポイントの特徴量とラベルを集める。
+    → (特徴量 (M, 51), ラベル (M, 3) 0〜10, データセットでの番号 (M,))
+    キーポイントが無い画像（ストアに無い / 人が写っていない）は飛ばす。
+    """
+    by_stem = {image_key(name): i for i, name in enumerate(store.names)}
+    images = store.images
+    keypoints = store.keypoints
+
+    items, rows = [], []
+    for i, name in enumerate(dataset.names):
+        j = by_stem.get(image_key(name))
+        if j is None:
+            continue
+        _, _, start, count = (int(v) for v in images[j])
+        items.append(np.asarray(keypoints[start:start + count]))
+        rows.append(i)
+
+    features, valid = keypoint_features(items, conf_threshold)
+    rows = np.asarray(rows, dtype=np.int64)[valid]
+    columns = [dataset.columns.index(t) for t in TARGETS]
+    return features, dataset.labels[rows][:, columns], rows
+
+
+def make_model(kind):
+    if kind == "mlp":
+        return make_pipeline(
+            StandardScaler(),
+            MLPRegressor(hidden_layer_sizes=(128, 64), alpha=1e-3, early_stopping=True,
+                         max_iter=2000, random_state=42),
+        )
+    if kind == "gbm":
+        return MultiOutputRegressor(HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, random_state=42))
+    raise ValueError(f"未対応のモデル: {kind}")
+
+
+def per_sample_ms(fn, items):
+    """1件ずつ呼んだ時の平均時間（ゲームでは1回のシャッターで1件ずつ採点するため）"""
+    fn(items[:1])  # 初回の準備を計測に含めない
+    start = time.perf_counter()
+    for i in range(len(items)):
+        fn(items[i:i + 1])
+    return (time.perf_counter() - start) / max(1, len(items)) * 1000.0
+
+
+def print_row(label, preds, labels, ms):
+    maes = np.abs(preds - labels).mean(axis=0)
+    cells = " ".join(f"{mae:8.3f}" for mae in maes)
+    print(f"{label:14s} {cells} {maes.mean():8.3f} {ms:10.3f}")
+    return float(maes.mean())
+
+
+def main():
+    p = argparse.ArgumentParser(description="キーポイントから得点を出すモデルを学習し、VGG16 版と比べる")
+    p.add_argument("--store", default=STORE_DIR, help="KeypointStore のフォルダ")
+    p.add_argument("--model", nargs="+", default=["mlp", "gbm"], choices=["mlp", "gbm"])
+    p.add_argument("--conf-threshold", type=float, default=CONF_THRESHOLD)
+    p.add_argument("--compare-vgg", action="store_true", help="同じテスト画像で ScorePredictor(keras) とも比べる")
+    p.add_argument("--output", default=MODEL_PATH)
+    args = p.parse_args()
+
+    dataset = ScoreDataset()
+    print(f"データセットキャッシュ: {dataset.build()} → {len(dataset)}枚")
+    store = KeypointStore(args.store)
+    features, labels, rows = load_keypoint_dataset(store, dataset, args.conf_threshold)
+    print(f"キーポイントあり: {len(rows)} / {len(dataset)}枚（{store.root}）")
+    if not len(rows):
+        raise SystemExit("学習画像に対応するキーポイントがありません。--store を確認してください。")
+
+    # train_score_models.py と同じテスト画像
+    _, test_idx = train_test_split(np.arange(len(dataset)), test_size=0.2, random_state=42)
+    is_test = np.isin(rows, test_idx)
+    x_train, y_train = features[~is_test], labels[~is_test]
+    x_test, y_test = features[is_test], labels[is_test]
+    print(f"学習: {len(x_train)}件 / テスト: {len(x_test)}件")
+
+    names = list(TARGETS.values())
+    print("=" * 62)
+    print(f"{'model':14s} " + " ".join(f"{n:>8s}" for n in names) + f" {'mean':>8s} {'ms/件':>10s}")
+    print_row("平均値を出す", np.tile(y_train.mean(axis=0), (len(y_test), 1)), y_test, 0.0)
+
+    best = None
+    for kind in args.model:
+        model = make_model(kind)
+        model.fit(x_train, y_train)
+        preds = np.clip(model.predict(x_test), 0.0, 10.0)
+        ms = per_sample_ms(model.predict, x_test)
+        mae = print_row(f"keypoint-{kind}", preds, y_test, ms)
+        if best is None or mae < best[0]:
+            best = (mae, kind, model)
+
+    if args.compare_vgg:
+        from game_test.scenes.score_predictor import ScorePredictor
+
+        predictor = ScorePredictor(backend="keras")
+        images = dataset.images
+        test_images = [np.asarray(images[i]) for i in rows[is_test]]
+        results = predictor.predict_batch(test_images)
+        preds = np.array([[r[n] for n in names] for r in results])
+        ms = per_sample_ms(predictor.predict_batch, test_images)
+        print_row("vgg16(keras)", preds, y_test, ms)
+    print("=" * 62)
+
+    mae, kind, model = best
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    joblib.dump({
+        "kind": kind,
+        "model": model,
+        "targets": names,
+        "conf_threshold": args.conf_threshold,
+    }, args.output)
+    print(f"keypoint-{kind}（テスト MAE {mae:.3f}）を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
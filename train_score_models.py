@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Dynamic / Stable / Unique の得点モデルをまとめて学習する。
+
+画像と Excel は1回だけ読み、VGG16 の固定部分も1回だけ計算して3スコアで共有する。
+画像は score_dataset.py のリサイズ済みキャッシュ（memmap）から tf.data で読むので、全画像をメモリに載せない。
+保存したモデルは ScorePredictor がそのまま読み込める
+（3スコアなら model/multi_score_model_final.keras、1スコアなら model/<名前>_score_model_final.keras）。
+ScorePredictor は既定（model_source="auto"）で一番新しく保存されたモデルを読むので、学習し直せばそちらが使われる。
+model_dynamic.py / model_stable.py / model_unique.py は1スコアだけでこれを実行する。
+
+例:
+    python train_score_models.py                                  # 3スコアを1モデルで学習
+    python train_score_models.py --per-target-heads               # block5 + ヘッドはスコアごと
+    python train_score_models.py --targets avg_unique --epochs 20  # 1スコアだけ学習
+    python sweep_score_models.py --lr 1e-5 3e-5 --unfreeze 4 8     # 学習率などの組み合わせを並列に試す
+"""
+
+import argparse
+import os
+
+import cv2
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from score_training import (
+    IMAGE_HEIGHT, IMAGE_WIDTH, NUM_TRAINABLE_VGG_LAYERS, TARGETS,
+    create_model, create_multi_model, fit_score_model, image_dataset, load_dataset, preprocess,
+)
+
+MODEL_DIR = "model"
+MULTI_MODEL_NAME = "multi_score_model_final.keras"
+SINGLE_MODEL_NAME = "{name}_score_model_final.keras"
+PREDICT_IMAGE_PATH = "test/2011tokyo_mister_fp-011-320x480.jpg"
+
+
+def default_output(targets):
+    if len(targets) == len(TARGETS):
+        return os.path.join(MODEL_DIR, MULTI_MODEL_NAME)
+    name = "_".join(TARGETS[t].lower() for t in targets)
+    return os.path.join(MODEL_DIR, SINGLE_MODEL_NAME.format(name=name))
+
+
+def as_outputs(predictions):
+    """model.predict の結果を出力ごとの (N,) 配列のリストにそろえる"""
+    if not isinstance(predictions, list):
+        predictions = [predictions]
+    return [p[:, 0] for p in predictions]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="得点モデルを学習する（複数スコアは1モデルにまとめる）")
+    p.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS),
+                   help="学習するラベル列（複数なら1つのモデルで同時に学習）")
+    p.add_argument("--per-target-heads", action="store_true",
+                   help="固定部分だけ共有し、block5 + ヘッドをスコアごとに持つ")
+    p.add_argument("--epochs", type=int, default=15)
+    p.add_argument("--batch-size", type=int, default=32)
+    p.add_argument("--lr", type=float, default=1e-5)
+    p.add_argument("--unfreeze", type=int, default=NUM_TRAINABLE_VGG_LAYERS,
+                   help="VGG16 の後ろから何層を学習させるか（4 なら block5）")
+    p.add_argument("--augment", action="store_true", help="データ拡張をする（モデル全体で学習するので遅い）")
+    p.add_argument("--no-feature-cache", action="store_true", help="固定部分の出力をキャッシュしない")
+    p.add_argument("--no-dataset-cache", action="store_true",
+                   help="データセットキャッシュ（score_dataset.py）を使わず、画像ファイルを直接読む")
+    p.add_argument("--limit", type=int, default=None, help="使う画像の上限（省略時は Excel にある全行）")
+    p.add_argument("--output", default=None, help="保存先（省略時は ScorePredictor が読む model/ 以下）")
+    args = p.parse_args(argv)
+    # 出力の並びは ScorePredictor と同じ Dynamic, Stable, Unique の順にする
+    args.targets = [t for t in TARGETS if t in args.targets]
+    if 1 < len(args.targets) < len(TARGETS) and args.output is None:
+        # ScorePredictor が読むのは3出力モデルか1スコアずつのモデルだけ
+        p.error("2スコアだけのモデルは ScorePredictor が読めません。"
+                "1スコアずつか3スコアまとめて学習するか、--output で保存先を指定してください")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    targets = args.targets
+    output_names = [TARGETS[t] for t in targets]
+
+    # 画像はリサイズ済みのデータセットキャッシュ（memmap）から、必要な分だけ tf.data で読む
+    source, labels = load_dataset(targets, limit=args.limit, use_cache=not args.no_dataset_cache)
+    label_matrix = np.stack([labels[t] for t in targets], axis=1)
+
+    # 分割（3スコアとも同じ分け方）
+    train_idx, test_idx = train_test_split(np.arange(len(source)), test_size=0.2, random_state=42)
+
+    if len(targets) == 1:
+        model = create_model(args.lr, args.unfreeze)
+        split = None
+        fit_labels = label_matrix[:, 0]
+    else:
+        model, trunk, tail = create_multi_model(output_names, args.per_target_heads, args.lr, args.unfreeze)
+        split = (trunk, tail)
+        fit_labels = [label_matrix[:, i] for i in range(len(targets))]
+
+    print(f"学習開始... ({', '.join(targets)})")
+    fit_score_model(
+        model, source, fit_labels, train_idx,
+        epochs=args.epochs, batch_size=args.batch_size, validation_split=0.2,
+        augment=args.augment, use_feature_cache=not args.no_feature_cache, split=split,
+    )
+
+    # テストデータでの誤差（0〜10 のスコアで表示）
+    preds = as_outputs(model.predict(image_dataset(source, indices=test_idx, batch_size=args.batch_size), verbose=0))
+    test_labels = label_matrix[test_idx]
+    print("-" * 40)
+    for i, name in enumerate(output_names):
+        mae = np.abs(preds[i] - test_labels[:, i]).mean() * 10.0
+        print(f"{name:8s} テスト MAE: {mae:.3f}")
+    print("-" * 40)
+
+    # 予測テスト
+    img = cv2.imread(PREDICT_IMAGE_PATH) if os.path.exists(PREDICT_IMAGE_PATH) else None
+    if img is not None:
+        img = preprocess(np.array([cv2.resize(img, (IMAGE_WIDTH, IMAGE_HEIGHT))]))
+        for name, pred in zip(output_names, as_outputs(model.predict(img, verbose=0))):
+            print(f"{name} Score (0-10): {pred[0] * 10.0:.2f}")
+    else:
+        print("予測用画像なし")
+
+    # モデル保存
+    output = args.output or default_output(targets)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    model.save(output)
+    print(f"モデルを保存しました: {output}")
+    return model
+
+
+if __name__ == "__main__":
+    main()